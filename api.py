@@ -0,0 +1,259 @@
+"""JSON API (v1).
+
+CRUD for donors, recipients, donations and requests under /api/v1. Writes
+accept one object or an array and apply the whole batch in one
+transaction, validated by the same WTForms classes as the HTML pages.
+?fields= trims the payload and GETs carry an ETag for conditional requests.
+The blueprint is exempt from CSRF but only accepts application/json
+bodies, which browsers cannot send cross-site without a CORS preflight.
+"""
+from flask import Blueprint, request, jsonify
+
+from app import (Donor, Recipient, Donation, BloodRequest, DonorForm, RecipientForm, DonationForm,
+                 BloodRequestForm, ARCHIVE_MODELS, DEDUPE_ENTITIES, PUBLIC_COLUMNS, REQUEST_STATUSES,
+                 batch_duplicates, bump_stats, contact_keys, duplicate_errors, export_value, has_dependents,
+                 keyset_paginate, list_source, primary_key, record_donation, regroup_donations, rollup_donation,
+                 rollup_request, search_filter, soft_delete, validate_record)
+from extensions import csrf, db
+
+API_BATCH_LIMIT = 1000
+API_PAGE_LIMIT = 100
+
+API_RESOURCES = {
+    'donors': {'model': Donor, 'form': DonorForm, 'searchable': True},
+    'recipients': {'model': Recipient, 'form': RecipientForm, 'searchable': True},
+    'donations': {'model': Donation, 'form': DonationForm, 'searchable': False},
+    'requests': {'model': BloodRequest, 'form': BloodRequestForm, 'searchable': False},
+}
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+csrf.exempt(api_v1)
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+@api_v1.errorhandler(ApiError)
+def handle_api_error(error):
+    body = {'error': str(error)}
+    if error.details is not None:
+        body['details'] = error.details
+    return jsonify(body), error.status
+
+def api_resource(resource):
+    if resource not in API_RESOURCES:
+        raise ApiError(f'Unknown resource: {resource}', 404)
+    return API_RESOURCES[resource]
+
+def selected_fields(model):
+    columns = list(PUBLIC_COLUMNS[model])
+    fields = request.args.get('fields')
+    if not fields:
+        return columns
+    requested = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in requested if f not in columns]
+    if unknown:
+        raise ApiError(f'Unknown field(s): {", ".join(unknown)}')
+    return requested
+
+def serialize(record, fields):
+    return {field: export_value(getattr(record, field)) for field in fields}
+
+def conditional_json(body, status=200):
+    response = jsonify(body)
+    response.status_code = status
+    response.add_etag()
+    return response.make_conditional(request)
+
+def json_batch():
+    if not request.is_json:
+        raise ApiError('Expected an application/json body', 415)
+    payload = request.get_json(silent=True)
+    if payload is None:
+        raise ApiError('Malformed JSON body')
+    items = payload if isinstance(payload, list) else [payload]
+    if not items or len(items) > API_BATCH_LIMIT or not all(isinstance(i, dict) for i in items):
+        raise ApiError(f'Expected an object or an array of 1-{API_BATCH_LIMIT} objects')
+    return items, isinstance(payload, list)
+
+def validate_batch(form_class, items):
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        data, item_errors = validate_record(form_class, item)
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+        valid.append(data)
+    if errors:
+        raise ApiError('Validation failed', 422, errors)
+    return valid
+
+def create_record(resource, model, data):
+    record = model(**data)
+    if resource == 'donations':
+        record_donation(record)
+    else:
+        db.session.add(record)
+        if resource == 'requests':
+            rollup_request(record)
+        bump_stats(**{resource: 1})
+    return record
+
+def delete_record(resource, record):
+    if resource == 'donors' and has_dependents('donors', record.donor_id):
+        raise ApiError('Cannot delete donor with existing donations', 409)
+    if resource == 'recipients' and has_dependents('recipients', record.recipient_id):
+        raise ApiError('Cannot delete recipient with existing blood requests', 409)
+    if resource == 'donations':
+        rollup_donation(record, -1)
+    elif resource == 'requests':
+        rollup_request(record, -1)
+    soft_delete(record)
+    bump_stats(**{resource: -1})
+
+def apply_update(resource, form_class, record, changes):
+    # Partial update: unchanged fields are taken from the stored row so the
+    # full form validation still applies
+    form = form_class(formdata=None, meta={'csrf': False})
+    current = {name: export_value(getattr(record, name)) for name in form.data}
+    data, errors = validate_record(form_class, {**current, **changes})
+    if errors:
+        return errors
+    if resource == 'requests' and 'status' in changes and changes['status'] not in REQUEST_STATUSES:
+        return {'status': [f'Must be one of {", ".join(REQUEST_STATUSES)}']}
+    if resource in DEDUPE_ENTITIES and ('phone' in changes or 'email' in changes):
+        model = type(record)
+        errors = duplicate_errors(model, data['phone'], data['email'],
+                                  exclude_id=getattr(record, primary_key(model).key))
+        if errors:
+            return errors
+
+    rollup = {'donations': rollup_donation, 'requests': rollup_request}.get(resource)
+    counted = rollup and rollup(record, -1)
+    if resource == 'donations' and data['donor_id'] != record.donor_id:
+        record.blood_group = db.session.get(Donor, data['donor_id']).blood_group
+    elif resource == 'donors' and data['blood_group'] != record.blood_group:
+        regroup_donations(record.donor_id, data['blood_group'])
+    if resource == 'requests' and 'status' in changes:
+        record.status = changes['status']
+    for name, value in data.items():
+        setattr(record, name, value)
+    if counted:
+        rollup(record)
+    return None
+
+@api_v1.route('/<resource>', methods=['GET'])
+def api_list(resource):
+    config = api_resource(resource)
+    model = config['model']
+    fields = selected_fields(model)
+    limit = min(max(request.args.get('limit', API_PAGE_LIMIT, type=int), 1), API_PAGE_LIMIT)
+
+    # ?archived=1 adds archived donations/requests, flagged "archived": true
+    archived = request.args.get('archived', type=int) == 1 and model in ARCHIVE_MODELS
+    source, options = list_source(model, archived)
+    query = db.session.query(source).options(*options)
+    search = request.args.get('search', '')
+    if search and config['searchable']:
+        query = query.filter(search_filter(model, search))
+    if request.args.get('status') and resource == 'requests':
+        query = query.filter(source.status == request.args['status'])
+    if archived:
+        fields = fields + ['archived']
+
+    try:
+        page = keyset_paginate(query, source.created_at, getattr(source, primary_key(model).key),
+                               request.args.get('after', ''), per_page=limit)
+    except ValueError:
+        raise ApiError('Invalid cursor')
+    return conditional_json({'items': [serialize(r, fields) for r in page.items],
+                             'next_cursor': page.next_cursor})
+
+@api_v1.route('/<resource>/<int:record_id>', methods=['GET'])
+def api_get(resource, record_id):
+    model = api_resource(resource)['model']
+    record = db.session.get(model, record_id)
+    if record is None:
+        raise ApiError('Not found', 404)
+    return conditional_json(serialize(record, selected_fields(model)))
+
+@api_v1.route('/<resource>', methods=['POST'])
+def api_create(resource):
+    config = api_resource(resource)
+    items, is_batch = json_batch()
+    valid = validate_batch(config['form'], items)
+    if resource in DEDUPE_ENTITIES:
+        keyed = [dict(data, **contact_keys(data)) for data in valid]
+        duplicates = batch_duplicates(config['model'], keyed, [f'item {i}' for i in range(len(keyed))])
+        if duplicates:
+            raise ApiError('Duplicate records', 409, [{'index': index, 'errors': {'duplicate': [message]}}
+                                                      for index, message in sorted(duplicates.items())])
+    try:
+        records = [create_record(resource, config['model'], data) for data in valid]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise ApiError(f'Error creating {resource}: {e}', 500)
+
+    fields = selected_fields(config['model'])
+    body = [serialize(r, fields) for r in records]
+    return jsonify({'items': body} if is_batch else body[0]), 201
+
+@api_v1.route('/<resource>', methods=['PATCH'])
+@api_v1.route('/<resource>/<int:record_id>', methods=['PATCH'])
+def api_update(resource, record_id=None):
+    config = api_resource(resource)
+    model = config['model']
+    pk = primary_key(model)
+    items, is_batch = json_batch()
+    if record_id is not None:
+        if is_batch:
+            raise ApiError('Send a single object when updating by id')
+        items = [{**items[0], pk.key: record_id}]
+
+    ids = [item.get(pk.key) for item in items]
+    if not all(isinstance(i, int) for i in ids):
+        raise ApiError(f'Every item needs an integer {pk.key}')
+    records = {getattr(r, pk.key): r for r in model.query.filter(pk.in_(ids))}
+
+    errors = []
+    for index, item in enumerate(items):
+        record = records.get(item[pk.key])
+        if record is None:
+            errors.append({'index': index, 'errors': {pk.key: ['Not found']}})
+            continue
+        changes = {k: v for k, v in item.items() if k != pk.key}
+        item_errors = apply_update(resource, config['form'], record, changes)
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+    if errors:
+        db.session.rollback()
+        raise ApiError('Validation failed', 422, errors)
+
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise ApiError(f'Error updating {resource}: {e}', 500)
+
+    fields = selected_fields(model)
+    body = [serialize(records[i], fields) for i in ids]
+    return jsonify({'items': body} if is_batch else body[0])
+
+@api_v1.route('/<resource>/<int:record_id>', methods=['DELETE'])
+def api_delete(resource, record_id):
+    model = api_resource(resource)['model']
+    record = db.session.get(model, record_id)
+    if record is None:
+        raise ApiError('Not found', 404)
+    try:
+        delete_record(resource, record)
+        db.session.commit()
+    except ApiError:
+        db.session.rollback()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        raise ApiError(f'Error deleting {resource}: {e}', 500)
+    return '', 204
@@ -1,29 +1,141 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from flask_wtf import FlaskForm, CSRFProtect
+from flask import Flask, Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, abort, g, has_app_context, has_request_context, current_app
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import Pool
+from flask_wtf import FlaskForm
 from wtforms import StringField, IntegerField, SelectField, DateField, TextAreaField
-from wtforms.validators import DataRequired, Email, Length, NumberRange, Optional
-from datetime import datetime, date
+from wtforms.validators import DataRequired, Email, InputRequired, Length, NumberRange, Optional, ValidationError
+from wtforms.widgets import HiddenInput
+from array import array
+from datetime import datetime, date, timedelta
+from werkzeug.datastructures import MultiDict
+from werkzeug.utils import import_string
+import csv
+import hashlib
+import io
+import itertools
+import json
+import math
 import os
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+import weakref
+import zlib
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+try:
+    import redis
+except ImportError:  # optional: only needed for a shared cache (REDIS_URL)
+    redis = None
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///blood_donation.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+from extensions import csrf, db
+from jobs import enqueue_job, job_handler, periodic_job, start_background_jobs, start_job_workers
+from metrics import QUERY_COUNT_BUCKETS, request_metrics
 
-# Initialize extensions
-db = SQLAlchemy(app)
-csrf = CSRFProtect(app)
+# `python app.py` runs this file as __main__; api.py and cli.py import it as
+# app, which has to be this module rather than a second copy of it
+if __name__ == '__main__':
+    sys.modules['app'] = sys.modules[__name__]
+
+# Database engine configuration
+# MySQL gets a sized connection pool with pre-ping and recycling so idle
+# connections dropped by the server are replaced transparently. SQLite gets
+# WAL mode, synchronous=NORMAL and a busy timeout on every new connection so
+# concurrent writers wait for the lock instead of failing with
+# "database is locked".
+def database_uri():
+    uri = os.getenv('DATABASE_URL', 'sqlite:///blood_donation.db')
+    # PyMySQL is the driver we ship; plain mysql:// would look for MySQLdb
+    if uri.startswith('mysql://'):
+        uri = 'mysql+pymysql://' + uri[len('mysql://'):]
+    return uri
+
+def engine_options(uri):
+    if uri.startswith('sqlite'):
+        return {'connect_args': {'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000}}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+        cursor.close()
+
+# Pool metrics, exposed at /api/pool
+pool_metrics = {'connects': 0, 'checkouts': 0, 'checkins': 0, 'invalidations': 0,
+                'checked_out': 0, 'max_checked_out': 0, 'hold_seconds_total': 0.0}
+_pool_metrics_lock = threading.Lock()
+
+@event.listens_for(Pool, 'connect')
+def count_pool_connect(dbapi_connection, connection_record):
+    with _pool_metrics_lock:
+        pool_metrics['connects'] += 1
+
+@event.listens_for(Pool, 'checkout')
+def count_pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info['checked_out_at'] = time.perf_counter()
+    with _pool_metrics_lock:
+        pool_metrics['checkouts'] += 1
+        pool_metrics['checked_out'] += 1
+        pool_metrics['max_checked_out'] = max(pool_metrics['max_checked_out'], pool_metrics['checked_out'])
+
+@event.listens_for(Pool, 'checkin')
+def count_pool_checkin(dbapi_connection, connection_record):
+    checked_out_at = connection_record.info.pop('checked_out_at', None)
+    with _pool_metrics_lock:
+        pool_metrics['checkins'] += 1
+        if checked_out_at is not None:
+            pool_metrics['checked_out'] -= 1
+            pool_metrics['hold_seconds_total'] += time.perf_counter() - checked_out_at
+
+@event.listens_for(Pool, 'invalidate')
+def count_pool_invalidate(dbapi_connection, connection_record, exception):
+    with _pool_metrics_lock:
+        pool_metrics['invalidations'] += 1
+
+# Extensions and blueprints
+# Nothing here is bound to an application: create_app() (at the bottom of
+# this file) builds the config, initialises the extensions (extensions.py)
+# and registers the blueprints. Importing the module is therefore cheap and
+# side-effect free, and every process or test can build its own app.
+
+# Pages, the page-facing /api/* endpoints, hooks and error handlers; the
+# versioned JSON API (api.py) and the CLI commands (cli.py) are blueprints
+# of their own
+main = Blueprint('main', __name__)
 
 # Database Models
-class Donor(db.Model):
+class SoftDeleteMixin:
+    # Deleting stamps the row instead of removing it; see "Soft delete and archival".
+    # Every ORM select filters on "deleted_at IS NULL"; the created_at list
+    # indexes are partial indexes over those live rows (see live_index())
+    deleted_at = db.Column(db.DateTime, nullable=True)
+
+def live_index(name, *columns):
+    # Only indexes the rows that are not soft-deleted. Unlike an index on
+    # deleted_at it never tempts the planner into walking and sorting every
+    # live row; MySQL ignores the condition and indexes all rows
+    live = db.text('deleted_at IS NULL')
+    return db.Index(name, *columns, sqlite_where=live, postgresql_where=live)
+
+class Donor(SoftDeleteMixin, db.Model):
     __tablename__ = 'donors'
     donor_id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     age = db.Column(db.Integer, nullable=False)
     gender = db.Column(db.String(10), nullable=False)
     blood_group = db.Column(db.String(5), nullable=False)
@@ -32,13 +144,26 @@ class Donor(db.Model):
     address = db.Column(db.Text, nullable=False)
     last_donation_date = db.Column(db.Date, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Normalized copies of phone/email for duplicate detection
+    phone_key = db.Column(db.String(15), nullable=True, index=True)
+    email_key = db.Column(db.String(100), nullable=True, index=True)
     
     donations = db.relationship('Donation', backref='donor', lazy=True)
 
-class Recipient(db.Model):
+    @db.validates('phone', 'email')
+    def update_contact_keys(self, field, value):
+        setattr(self, f'{field}_key', CONTACT_NORMALIZERS[field](value))
+        return value
+
+    __table_args__ = (
+        live_index('ix_donors_live_created_at_id', 'created_at', 'donor_id'),
+        db.Index('ix_donors_blood_group_last_donation', 'blood_group', 'last_donation_date'),
+    )
+
+class Recipient(SoftDeleteMixin, db.Model):
     __tablename__ = 'recipients'
     recipient_id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     age = db.Column(db.Integer, nullable=False)
     gender = db.Column(db.String(10), nullable=False)
     blood_group = db.Column(db.String(5), nullable=False)
@@ -47,10 +172,22 @@ class Recipient(db.Model):
     address = db.Column(db.Text, nullable=False)
     request_status = db.Column(db.String(20), default='Pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    phone_key = db.Column(db.String(15), nullable=True, index=True)
+    email_key = db.Column(db.String(100), nullable=True, index=True)
     
     requests = db.relationship('BloodRequest', backref='recipient', lazy=True)
 
-class BloodRequest(db.Model):
+    @db.validates('phone', 'email')
+    def update_contact_keys(self, field, value):
+        setattr(self, f'{field}_key', CONTACT_NORMALIZERS[field](value))
+        return value
+
+    __table_args__ = (
+        live_index('ix_recipients_live_created_at_id', 'created_at', 'recipient_id'),
+        db.Index('ix_recipients_blood_group_created_at_id', 'blood_group', 'created_at', 'recipient_id'),
+    )
+
+class BloodRequest(SoftDeleteMixin, db.Model):
     __tablename__ = 'blood_requests'
     request_id = db.Column(db.Integer, primary_key=True)
     recipient_id = db.Column(db.Integer, db.ForeignKey('recipients.recipient_id'), nullable=False)
@@ -58,8 +195,23 @@ class BloodRequest(db.Model):
     quantity_needed_ml = db.Column(db.Integer, nullable=False)
     status = db.Column(db.String(20), default='Pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # True for rows read from the archive by an include-archived list
+    archived = db.query_expression()
+
+    __table_args__ = (
+        live_index('ix_blood_requests_live_created_at_id', 'created_at', 'request_id'),
+        db.Index('ix_blood_requests_status_created_at_id', 'status', 'created_at', 'request_id'),
+        db.Index('ix_blood_requests_recipient_id', 'recipient_id'),
+    )
 
-class Donation(db.Model):
+def donor_blood_group(context):
+    # Default for donation rows inserted without their donor's group
+    donors = Donor.__table__
+    return context.connection.scalar(
+        db.select(donors.c.blood_group).where(donors.c.donor_id == context.get_current_parameters()['donor_id'])
+    )
+
+class Donation(SoftDeleteMixin, db.Model):
     __tablename__ = 'donations'
     donation_id = db.Column(db.Integer, primary_key=True)
     donor_id = db.Column(db.Integer, db.ForeignKey('donors.donor_id'), nullable=False)
@@ -67,6 +219,56 @@ class Donation(db.Model):
     blood_volume_ml = db.Column(db.Integer, nullable=False)
     hospital = db.Column(db.String(100), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # The donor's group when the donation was recorded (moved along if the
+    # donor's group is corrected); the rollups count the donation under it
+    blood_group = db.Column(db.String(5), nullable=False, default=donor_blood_group)
+    # Whether the daily rollup counts the donation yet: its stocking job
+    # sets it, and edits and deletes only take back what was counted
+    rolled_up = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    archived = db.query_expression()
+
+    __table_args__ = (
+        live_index('ix_donations_live_created_at_id', 'created_at', 'donation_id'),
+        db.Index('ix_donations_donor_id_donation_date', 'donor_id', 'donation_date'),
+        db.Index('ix_donations_donation_date', 'donation_date'),
+    )
+
+# Archived history: the live table's columns plus archived_at, keeping the
+# original ids
+class DonationArchive(db.Model):
+    __tablename__ = 'donations_archive'
+    donation_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    donor_id = db.Column(db.Integer, nullable=False)
+    donation_date = db.Column(db.Date, nullable=False)
+    blood_volume_ml = db.Column(db.Integer, nullable=False)
+    hospital = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime)
+    blood_group = db.Column(db.String(5), nullable=False)
+    rolled_up = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        live_index('ix_donations_archive_live_created_at_id', 'created_at', 'donation_id'),
+        db.Index('ix_donations_archive_donor_id', 'donor_id'),
+    )
+
+class BloodRequestArchive(db.Model):
+    __tablename__ = 'blood_requests_archive'
+    request_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    recipient_id = db.Column(db.Integer, nullable=False)
+    blood_group = db.Column(db.String(5), nullable=False)
+    quantity_needed_ml = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        live_index('ix_blood_requests_archive_live_created_at_id', 'created_at', 'request_id'),
+        db.Index('ix_blood_requests_archive_status_created_at_id', 'status', 'created_at', 'request_id'),
+        db.Index('ix_blood_requests_archive_recipient_id', 'recipient_id'),
+    )
 
 class BloodInventory(db.Model):
     __tablename__ = 'blood_inventory'
@@ -75,6 +277,882 @@ class BloodInventory(db.Model):
     total_units = db.Column(db.Integer, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class InventoryMovement(db.Model):
+    __tablename__ = 'inventory_ledger'
+    movement_id = db.Column(db.Integer, primary_key=True)
+    blood_group = db.Column(db.String(5), nullable=False, index=True)
+    units = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)
+    # Plain columns, not foreign keys: ledger rows outlive deleted donations/requests
+    donation_id = db.Column(db.Integer, nullable=True)
+    request_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Inventory ledger
+# Stock changes are applied as a single "total_units = total_units + n"
+# UPDATE, so concurrent writers can never lose an increment, and every change
+# is recorded as an append-only movement row in the same transaction.
+def increment_inventory(blood_group, units):
+    increment = (
+        db.update(BloodInventory)
+        .where(BloodInventory.blood_group == blood_group)
+        .values(total_units=BloodInventory.total_units + units, last_updated=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(increment).rowcount == 0:
+        try:
+            # First stock for this group; a concurrent insert loses on the
+            # unique blood_group constraint and falls back to the increment
+            with db.session.begin_nested():
+                db.session.add(BloodInventory(blood_group=blood_group, total_units=units))
+        except IntegrityError:
+            db.session.execute(increment)
+
+def adjust_inventory(blood_group, units, reason, donation_id=None, request_id=None):
+    increment_inventory(blood_group, units)
+    db.session.add(InventoryMovement(blood_group=blood_group, units=units, reason=reason,
+                                     donation_id=donation_id, request_id=request_id))
+    if units < 0:
+        check_low_stock(blood_group)
+
+class DashboardStats(db.Model):
+    __tablename__ = 'dashboard_stats'
+    stats_id = db.Column(db.Integer, primary_key=True)
+    total_donors = db.Column(db.Integer, nullable=False, default=0)
+    total_recipients = db.Column(db.Integer, nullable=False, default=0)
+    total_donations = db.Column(db.Integer, nullable=False, default=0)
+    total_requests = db.Column(db.Integer, nullable=False, default=0)
+    last_reconciled = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Dashboard counters
+# The counters live in a single dashboard_stats row that the write routes
+# adjust inside their own transaction, so reading them never scans the
+# entity tables. reconcile_stats() recomputes the row from scratch and is
+# run periodically to repair any drift (e.g. rows changed outside the app).
+STATS_ROW_ID = 1
+
+def reconcile_stats():
+    stats = db.session.get(DashboardStats, STATS_ROW_ID)
+    if stats is None:
+        stats = DashboardStats(stats_id=STATS_ROW_ID)
+        db.session.add(stats)
+
+    stats.total_donors = Donor.query.count()
+    stats.total_recipients = Recipient.query.count()
+    stats.total_donations = Donation.query.count()
+    stats.total_requests = BloodRequest.query.count()
+    stats.last_reconciled = datetime.utcnow()
+    return stats
+
+def bump_stats(**deltas):
+    # Atomic "total_x = total_x + n" so concurrent writers never lose an update
+    values = {
+        f'total_{name}': getattr(DashboardStats, f'total_{name}') + delta
+        for name, delta in deltas.items()
+    }
+    result = db.session.execute(
+        db.update(DashboardStats)
+        .where(DashboardStats.stats_id == STATS_ROW_ID)
+        .values(**values)
+    )
+    if result.rowcount == 0:
+        # First write ever: build the row from the tables, which already
+        # include the pending change thanks to autoflush
+        reconcile_stats()
+
+def get_dashboard_stats():
+    stats = db.session.get(DashboardStats, STATS_ROW_ID)
+    if stats is None:
+        stats = reconcile_stats()
+        db.session.commit()
+    return stats
+
+# Blood units
+# Every collected bag is a blood_units row with its collection and expiry
+# dates. blood_inventory.total_units is the derived count of available units
+# per group, moved through adjust_inventory() in the same transaction as the
+# unit rows, so the inventory page still reads one row per group. The expiry
+# sweeper retires expired units in batches and allocation takes the units
+# that expire first (FEFO). Status changes are guarded on the current status,
+# so concurrent sweeps or allocations never count the same unit twice.
+UNIT_SHELF_LIFE_DAYS = 42
+EXPIRY_BATCH_SIZE = 500
+
+class BloodUnit(db.Model):
+    __tablename__ = 'blood_units'
+    unit_id = db.Column(db.Integer, primary_key=True)
+    blood_group = db.Column(db.String(5), nullable=False)
+    volume_ml = db.Column(db.Integer, nullable=False)
+    collected_on = db.Column(db.Date, nullable=False)
+    expires_on = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='Available')
+    # Plain columns like the ledger's, so donations and requests stay deletable
+    donation_id = db.Column(db.Integer)
+    request_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_blood_units_status_expires_on', 'status', 'expires_on'),
+        db.Index('ix_blood_units_fefo', 'blood_group', 'status', 'expires_on', 'unit_id'),
+    )
+
+def units_collected(volume_ml):
+    # A donation is at least one bag; "// 450" used to turn 400 ml into zero units
+    return max(1, round(volume_ml / UNIT_VOLUME_ML))
+
+def unit_rows(blood_group, volume_ml, collected_on, donation_id=None, today=None):
+    today = today or date.today()
+    count = units_collected(volume_ml)
+    expires_on = collected_on + timedelta(days=UNIT_SHELF_LIFE_DAYS)
+    # Back-dated collections can arrive already expired and never count as stock
+    status = 'Available' if expires_on >= today else 'Expired'
+    return [{'blood_group': blood_group, 'volume_ml': volume_ml // count, 'collected_on': collected_on,
+             'expires_on': expires_on, 'status': status, 'donation_id': donation_id,
+             'created_at': datetime.utcnow()}
+            for _ in range(count)]
+
+def stock_units(rows, reason, donation_id=None):
+    if not rows:
+        return
+    db.session.execute(db.insert(BloodUnit), rows)
+    available = {}
+    for row in rows:
+        if row['status'] == 'Available':
+            available[row['blood_group']] = available.get(row['blood_group'], 0) + 1
+    for blood_group, units in available.items():
+        adjust_inventory(blood_group, units, reason, donation_id=donation_id)
+
+def retire_units(blood_group, unit_ids, status, reason, request_id=None):
+    # Moves available units out of stock; returns how many actually moved
+    if not unit_ids:
+        return 0
+    moved = db.session.execute(
+        db.update(BloodUnit)
+        .where(BloodUnit.unit_id.in_(unit_ids), BloodUnit.status == 'Available')
+        .values(status=status, request_id=request_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if moved:
+        adjust_inventory(blood_group, -moved, reason, request_id=request_id)
+    return moved
+
+def fefo_units(blood_group, count, today=None):
+    today = today or date.today()
+    return db.session.scalars(
+        db.select(BloodUnit.unit_id)
+        .where(BloodUnit.blood_group == blood_group, BloodUnit.status == 'Available',
+               BloodUnit.expires_on >= today)
+        .order_by(BloodUnit.expires_on, BloodUnit.unit_id)
+        .limit(count)
+        .with_for_update()
+    ).all()
+
+def usable_stock(today=None):
+    today = today or date.today()
+    return dict(db.session.execute(
+        db.select(BloodUnit.blood_group, db.func.count())
+        .where(BloodUnit.status == 'Available', BloodUnit.expires_on >= today)
+        .group_by(BloodUnit.blood_group)
+    ).all())
+
+def expire_units(today=None, batch_size=EXPIRY_BATCH_SIZE):
+    # Retires one batch of expired units, oldest first; returns the batch size seen
+    today = today or date.today()
+    expired = db.session.execute(
+        db.select(BloodUnit.unit_id, BloodUnit.blood_group)
+        .where(BloodUnit.status == 'Available', BloodUnit.expires_on < today)
+        .order_by(BloodUnit.expires_on, BloodUnit.unit_id)
+        .limit(batch_size)
+        .with_for_update()
+    ).all()
+    by_group = {}
+    for unit_id, blood_group in expired:
+        by_group.setdefault(blood_group, []).append(unit_id)
+    for blood_group, unit_ids in by_group.items():
+        retire_units(blood_group, unit_ids, 'Expired', 'expiry')
+    return len(expired)
+
+def sweep_expired_units(today=None, batch_size=EXPIRY_BATCH_SIZE):
+    # One transaction per batch keeps row locks short on a large backlog
+    swept = 0
+    while True:
+        batch = expire_units(today, batch_size)
+        db.session.commit()
+        swept += batch
+        if batch < batch_size:
+            return swept
+
+def reconcile_inventory(adopt_untracked=False):
+    # Recomputes total_units from the available units. Stock recorded before
+    # units existed is either adopted as fresh units or dropped.
+    counts = dict(db.session.execute(
+        db.select(BloodUnit.blood_group, db.func.count())
+        .where(BloodUnit.status == 'Available')
+        .group_by(BloodUnit.blood_group)
+    ).all())
+    totals = {inv.blood_group: inv.total_units or 0 for inv in BloodInventory.query.with_for_update()}
+    for blood_group in set(counts) | set(totals):
+        drift = totals.get(blood_group, 0) - counts.get(blood_group, 0)
+        if drift > 0 and adopt_untracked:
+            db.session.execute(db.insert(BloodUnit),
+                               unit_rows(blood_group, UNIT_VOLUME_ML, date.today()) * drift)
+        elif drift:
+            adjust_inventory(blood_group, -drift, 'reconcile')
+
+# Analytics rollups
+# Daily totals kept next to the raw rows and adjusted in the same transaction
+# as every write, so reports read a bounded number of rollup rows per day in
+# range instead of scanning the donation and request history. Requests are
+# bucketed by the day they were made and count as fulfilled once approved or
+# completed. rebuild_rollups() backfills the tables from the raw rows.
+FULFILLED_STATUSES = ('Approved', 'Completed')
+
+class DonationRollup(db.Model):
+    __tablename__ = 'donation_daily_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    blood_group = db.Column(db.String(5), primary_key=True)
+    hospital = db.Column(db.String(100), primary_key=True)
+    donations = db.Column(db.Integer, nullable=False, default=0)
+    volume_ml = db.Column(db.Integer, nullable=False, default=0)
+
+class RequestRollup(db.Model):
+    __tablename__ = 'request_daily_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    blood_group = db.Column(db.String(5), primary_key=True)
+    requested = db.Column(db.Integer, nullable=False, default=0)
+    requested_ml = db.Column(db.Integer, nullable=False, default=0)
+    fulfilled = db.Column(db.Integer, nullable=False, default=0)
+
+def bump_rollup(model, key, **deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    columns = model.__table__.c
+    increment = (
+        db.update(model)
+        .where(*(columns[name] == value for name, value in key.items()))
+        .values({name: columns[name] + delta for name, delta in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(increment).rowcount == 0:
+        try:
+            # Same insert-or-increment race handling as increment_inventory()
+            with db.session.begin_nested():
+                db.session.add(model(**key, **deltas))
+        except IntegrityError:
+            db.session.execute(increment)
+
+def rollup_donation(donation, sign=1):
+    # Counts the donation in (sign=1) or takes it out of (sign=-1) its
+    # rollup row, keyed on its own blood group, unless the flag says it
+    # already is (or was never counted, e.g. its stocking job failed or has
+    # not run yet). Returns whether the rollup changed
+    flipped = db.session.execute(
+        db.update(Donation)
+        .where(Donation.donation_id == donation.donation_id, Donation.rolled_up == (sign < 0))
+        .values(rolled_up=sign > 0)
+    ).rowcount
+    if flipped:
+        bump_rollup(DonationRollup,
+                    {'day': donation.donation_date, 'blood_group': donation.blood_group,
+                     'hospital': donation.hospital},
+                    donations=sign, volume_ml=sign * donation.blood_volume_ml)
+    return bool(flipped)
+
+def rollup_new_donations(donation_ids):
+    # The stocking job's half: counts the donations not counted yet, with
+    # the values they have now, so an edit made before the job ran is what
+    # gets counted and a deleted donation is skipped
+    rows = db.session.execute(
+        db.select(Donation.donation_id, Donation.donation_date, Donation.blood_group, Donation.hospital,
+                  Donation.blood_volume_ml)
+        .where(Donation.donation_id.in_(donation_ids), Donation.rolled_up.is_(False))
+        .with_for_update()
+    ).all()
+    if not rows:
+        return
+    db.session.execute(
+        db.update(Donation.__table__).where(Donation.donation_id.in_([row.donation_id for row in rows]))
+        .values(rolled_up=True)
+    )
+    rollups = {}
+    for row in rows:
+        count, volume = rollups.get((row.donation_date, row.blood_group, row.hospital), (0, 0))
+        rollups[(row.donation_date, row.blood_group, row.hospital)] = (count + 1, volume + row.blood_volume_ml)
+    for (day, blood_group, hospital), (count, volume) in rollups.items():
+        bump_rollup(DonationRollup, {'day': day, 'blood_group': blood_group, 'hospital': hospital},
+                    donations=count, volume_ml=volume)
+
+def regroup_donations(donor_id, blood_group):
+    # A corrected donor blood group applies to their donations, archived
+    # ones included, and the counted ones move between rollup rows. The
+    # rows are touched first to lock them (SQLite: the write lock), so a
+    # stocking job cannot count one in between
+    for table in (Donation.__table__, DonationArchive.__table__):
+        db.session.execute(db.update(table).where(table.c.donor_id == donor_id)
+                           .values(rolled_up=table.c.rolled_up))
+        counted = db.session.execute(
+            db.select(table.c.blood_group, table.c.donation_date, table.c.hospital,
+                      db.func.count(), db.func.sum(table.c.blood_volume_ml))
+            .where(table.c.donor_id == donor_id, table.c.rolled_up.is_(True), table.c.blood_group != blood_group)
+            .group_by(table.c.blood_group, table.c.donation_date, table.c.hospital)
+        ).all()
+        for old_group, day, hospital, count, volume in counted:
+            bump_rollup(DonationRollup, {'day': day, 'blood_group': old_group, 'hospital': hospital},
+                        donations=-count, volume_ml=-volume)
+            bump_rollup(DonationRollup, {'day': day, 'blood_group': blood_group, 'hospital': hospital},
+                        donations=count, volume_ml=volume)
+        db.session.execute(db.update(table).where(table.c.donor_id == donor_id, table.c.blood_group != blood_group)
+                           .values(blood_group=blood_group))
+
+def rollup_request(blood_request, sign=1):
+    if blood_request.created_at is None:
+        db.session.flush()
+    bump_rollup(RequestRollup,
+                {'day': blood_request.created_at.date(), 'blood_group': blood_request.blood_group},
+                requested=sign, requested_ml=sign * blood_request.quantity_needed_ml,
+                fulfilled=sign * (blood_request.status in FULFILLED_STATUSES))
+    return True
+
+def rollup_request_status(blood_request, old_status):
+    fulfilled = (blood_request.status in FULFILLED_STATUSES) - (old_status in FULFILLED_STATUSES)
+    bump_rollup(RequestRollup,
+                {'day': blood_request.created_at.date(), 'blood_group': blood_request.blood_group},
+                fulfilled=fulfilled)
+
+def rebuild_rollups():
+    # Reads live and archived rows, deleted ones left out
+    donations, _ = list_source(Donation, True)
+    requests, _ = list_source(BloodRequest, True)
+    db.session.execute(db.delete(DonationRollup.__table__))
+    db.session.execute(db.delete(RequestRollup.__table__))
+    # Every live donation is counted from here on, so stocking jobs still
+    # queued leave the rollups alone
+    for table in (Donation.__table__, DonationArchive.__table__):
+        db.session.execute(db.update(table).values(rolled_up=table.c.deleted_at.is_(None)))
+    db.session.execute(DonationRollup.__table__.insert().from_select(
+        ['day', 'blood_group', 'hospital', 'donations', 'volume_ml'],
+        db.select(donations.donation_date, donations.blood_group, donations.hospital,
+                  db.func.count(), db.func.sum(donations.blood_volume_ml))
+        .group_by(donations.donation_date, donations.blood_group, donations.hospital)
+    ))
+    request_day = db.func.date(requests.created_at)
+    db.session.execute(RequestRollup.__table__.insert().from_select(
+        ['day', 'blood_group', 'requested', 'requested_ml', 'fulfilled'],
+        db.select(request_day, requests.blood_group, db.func.count(),
+                  db.func.sum(requests.quantity_needed_ml),
+                  db.func.sum(db.case((requests.status.in_(FULFILLED_STATUSES), 1), else_=0)))
+        .group_by(request_day, requests.blood_group)
+    ))
+
+REPORT_DEFAULT_DAYS = 30
+REPORT_MAX_DAYS = 731
+REPORT_PERIODS = ('day', 'month')
+
+def report_range(args):
+    end = date.fromisoformat(args['end']) if args.get('end') else date.today()
+    start = date.fromisoformat(args['start']) if args.get('start') \
+        else end - timedelta(days=REPORT_DEFAULT_DAYS - 1)
+    period = args.get('period') or 'day'
+    if period not in REPORT_PERIODS:
+        raise ValueError(f'period must be one of {", ".join(REPORT_PERIODS)}')
+    if start > end or (end - start).days >= REPORT_MAX_DAYS:
+        raise ValueError(f'start must be on or before end and at most {REPORT_MAX_DAYS} days earlier')
+    return start, end, period
+
+def rollup_report(start, end, period='day'):
+    # Reads only the rollup rows in [start, end]; cost depends on the range,
+    # not on how much history the raw tables hold
+    bucket = date.isoformat if period == 'day' else (lambda day: day.strftime('%Y-%m'))
+    series = {}
+    day = start
+    while day <= end:
+        key = bucket(day)
+        series.setdefault(key, {'period': key, 'donations': 0, 'volume_ml': 0,
+                                'requested': 0, 'requested_ml': 0, 'fulfilled': 0})
+        day += timedelta(days=1)
+    by_group = {group: {'blood_group': group, 'donations': 0, 'volume_ml': 0, 'requested': 0, 'fulfilled': 0}
+                for group in BLOOD_GROUPS}
+    by_hospital = {}
+
+    donation_rows = db.session.execute(
+        db.select(DonationRollup.day, DonationRollup.blood_group, DonationRollup.hospital,
+                  DonationRollup.donations, DonationRollup.volume_ml)
+        .where(DonationRollup.day.between(start, end))
+    )
+    for day, blood_group, hospital, donations, volume_ml in donation_rows:
+        hospital_totals = by_hospital.setdefault(hospital, {'hospital': hospital, 'donations': 0, 'volume_ml': 0})
+        for totals in (series[bucket(day)], by_group[blood_group], hospital_totals):
+            totals['donations'] += donations
+            totals['volume_ml'] += volume_ml
+
+    request_rows = db.session.execute(
+        db.select(RequestRollup.day, RequestRollup.blood_group, RequestRollup.requested,
+                  RequestRollup.requested_ml, RequestRollup.fulfilled)
+        .where(RequestRollup.day.between(start, end))
+    )
+    for day, blood_group, requested, requested_ml, fulfilled in request_rows:
+        point = series[bucket(day)]
+        point['requested'] += requested
+        point['requested_ml'] += requested_ml
+        point['fulfilled'] += fulfilled
+        by_group[blood_group]['requested'] += requested
+        by_group[blood_group]['fulfilled'] += fulfilled
+
+    points = list(series.values())
+    totals = {name: sum(point[name] for point in points)
+              for name in ('donations', 'volume_ml', 'requested', 'requested_ml', 'fulfilled')}
+    totals['fulfilment_rate'] = round(totals['fulfilled'] / totals['requested'], 3) if totals['requested'] else None
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'period': period,
+        'totals': totals,
+        'series': points,
+        'blood_groups': list(by_group.values()),
+        'hospitals': sorted(by_hospital.values(), key=lambda h: h['volume_ml'], reverse=True),
+    }
+
+# Jobs
+# The follow-up work queued by the writes below, and the periodic
+# maintenance; the queue and its workers are in jobs.py
+main.before_app_request(start_job_workers)
+
+@job_handler('stock_donation')
+def stock_donation_job(payloads):
+    # Same set-based shape as apply_donation_side_effects(), but each unit
+    # and movement keeps its donation_id
+    units = []
+    movements = []
+    added_by_group = {}
+    for payload in payloads:
+        collected_on = date.fromisoformat(payload['donation_date'])
+        rows = unit_rows(payload['blood_group'], payload['volume_ml'], collected_on,
+                         donation_id=payload['donation_id'])
+        units.extend(rows)
+        available = sum(row['status'] == 'Available' for row in rows)
+        if available:
+            added_by_group[payload['blood_group']] = added_by_group.get(payload['blood_group'], 0) + available
+            movements.append({'blood_group': payload['blood_group'], 'units': available, 'reason': 'donation',
+                              'donation_id': payload['donation_id'], 'created_at': datetime.utcnow()})
+
+    db.session.execute(db.insert(BloodUnit), units)
+    for group, added in added_by_group.items():
+        increment_inventory(group, added)
+    if movements:
+        db.session.execute(db.insert(InventoryMovement), movements)
+    rollup_new_donations([payload['donation_id'] for payload in payloads])
+
+def check_low_stock(blood_group):
+    units = db.session.scalar(db.select(BloodInventory.total_units)
+                              .where(BloodInventory.blood_group == blood_group))
+    if units is not None and units < current_app.config['LOW_STOCK_UNITS']:
+        # At most one alert per group per day
+        enqueue_job('low_stock_alert', {'blood_group': blood_group, 'units': units},
+                    key=f'low-stock:{blood_group}:{date.today().isoformat()}')
+
+@job_handler('low_stock_alert', transactional=False)
+def low_stock_alert_job(payloads):
+    url = current_app.config['LOW_STOCK_WEBHOOK_URL']
+    for payload in payloads:
+        current_app.logger.warning(f"Low stock: {payload['blood_group']} is down to {payload['units']} unit(s)")
+        if url:
+            body = json.dumps({'event': 'low_stock', **payload}).encode()
+            alert = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+            urllib.request.urlopen(alert, timeout=10).close()
+
+@periodic_job('reconcile_stats', 'STATS_RECONCILE_INTERVAL')
+def reconcile_stats_job(payloads):
+    reconcile_stats()
+    db.session.commit()
+
+@periodic_job('expire_units', 'EXPIRY_SWEEP_INTERVAL')
+def expire_units_job(payloads):
+    sweep_expired_units()
+
+# Cache
+# Read-through cache for small, hot, rarely-written data (the inventory rows
+# and the /api/stats payload). Entries are dropped after any commit that
+# wrote a table they depend on; CACHE_TTL only bounds staleness for writes
+# made outside the app. The in-process backend is per worker, so
+# multi-worker deployments should set REDIS_URL to share one cache.
+class LocalCache:
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        self._data[key] = (time.time() + ttl, value)
+
+    def delete(self, *keys):
+        for key in keys:
+            self._data.pop(key, None)
+
+class RedisCache:
+    prefix = 'bdms:'
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self._client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+def make_cache(redis_url):
+    if not redis_url:
+        return LocalCache()
+    if redis is None:
+        raise RuntimeError('REDIS_URL is set but the redis package is not installed')
+    return RedisCache(redis_url)
+
+def get_cache():
+    # One cache per app, created by create_app() from REDIS_URL
+    return current_app.extensions['cache']
+
+# table -> cache keys built from it
+CACHE_DEPENDENCIES = {
+    'blood_inventory': ('inventory', 'stats'),
+    'dashboard_stats': ('stats',),
+}
+
+def mark_cache_stale(session, tables):
+    stale = session.info.setdefault('stale_cache_keys', set())
+    for table in tables:
+        stale.update(CACHE_DEPENDENCIES.get(table, ()))
+
+@event.listens_for(db.session, 'before_flush')
+def track_flushed_tables(session, flush_context, instances):
+    objects = itertools.chain(session.new, session.dirty, session.deleted)
+    mark_cache_stale(session, {obj.__table__.name for obj in objects})
+
+@event.listens_for(db.session, 'do_orm_execute')
+def track_executed_tables(orm_execute_state):
+    # Bulk insert/update/delete statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mark_cache_stale(orm_execute_state.session, {orm_execute_state.statement.table.name})
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_stale_cache(session):
+    stale = session.info.pop('stale_cache_keys', None)
+    if stale:
+        get_cache().delete(*stale)
+        if 'stats' in stale:
+            live_stats.poke()
+
+def cached(key, loader):
+    value = get_cache().get(key)
+    if value is None:
+        value = loader()
+        get_cache().set(key, value, current_app.config['CACHE_TTL'])
+    return value
+
+def load_inventory():
+    return [{'blood_group': inv.blood_group, 'total_units': inv.total_units,
+             'last_updated': inv.last_updated.isoformat() if inv.last_updated else None}
+            for inv in BloodInventory.query.order_by(BloodInventory.blood_group)]
+
+def get_inventory():
+    return [dict(item, last_updated=datetime.fromisoformat(item['last_updated']) if item['last_updated'] else None)
+            for item in cached('inventory', load_inventory)]
+
+def load_stats():
+    counters = get_dashboard_stats()
+    payload = {
+        'total_donors': counters.total_donors,
+        'total_recipients': counters.total_recipients,
+        'total_donations': counters.total_donations,
+        'total_requests': counters.total_requests,
+        'blood_inventory': {item['blood_group']: item['total_units']
+                            for item in cached('inventory', load_inventory)},
+    }
+    etag = hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return {'payload': payload, 'etag': etag}
+
+# Live dashboard
+# One broadcaster per worker pushes /api/stats changes to every connected
+# Server-Sent Events client. A single background thread rebuilds the stats
+# payload when a commit in this worker touches them (or every
+# LIVE_STATS_POLL_INTERVAL seconds, which picks up other workers' writes
+# through the shared cache) and publishes it once; client streams only wait
+# on a condition and never touch the database. Run under gevent
+# (gunicorn -k gevent) so idle streams cost a greenlet, not a worker.
+class StatsBroadcaster:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._wakeup = threading.Event()
+        self._version = 0
+        self._payload = None
+        self._delta = None
+        self._etag = None
+        self._thread = None
+
+    @property
+    def has_snapshot(self):
+        return self._payload is not None
+
+    def poke(self):
+        self._wakeup.set()
+
+    def publish(self, payload, etag):
+        with self._condition:
+            if etag == self._etag:
+                return
+            previous = self._payload or {}
+            delta = {k: v for k, v in payload.items() if k != 'blood_inventory' and previous.get(k) != v}
+            inventory = {g: u for g, u in payload['blood_inventory'].items()
+                         if previous.get('blood_inventory', {}).get(g) != u}
+            if inventory:
+                delta['blood_inventory'] = inventory
+            self._payload, self._delta, self._etag = payload, delta, etag
+            self._version += 1
+            self._condition.notify_all()
+
+    def _run(self, flask_app):
+        while True:
+            self._wakeup.wait(flask_app.config['LIVE_STATS_POLL_INTERVAL'])
+            self._wakeup.clear()
+            with flask_app.app_context():
+                try:
+                    stats = cached('stats', load_stats)
+                    self.publish(stats['payload'], stats['etag'])
+                except Exception as e:
+                    flask_app.logger.warning(f'Live stats refresh failed: {e}')
+                finally:
+                    db.session.remove()
+
+    def start(self, flask_app):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(flask_app,),
+                                                name='live-stats', daemon=True)
+                self._thread.start()
+
+    def stream(self, heartbeat):
+        # Full snapshot first, then deltas; a client that fell more than one
+        # version behind gets a fresh snapshot instead
+        with self._condition:
+            version, payload = self._version, self._payload
+        yield f'event: stats\ndata: {json.dumps(payload)}\n\n'
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._version != version, timeout=heartbeat)
+                if self._version == version:
+                    message = ': keepalive\n\n'
+                elif self._version == version + 1:
+                    message = f'event: delta\ndata: {json.dumps(self._delta)}\n\n'
+                else:
+                    message = f'event: stats\ndata: {json.dumps(self._payload)}\n\n'
+                version = self._version
+            yield message
+
+live_stats = StatsBroadcaster()
+
+# Search
+# Name/email search goes through a real text index instead of ilike('%term%'):
+# an FTS5 trigram table on SQLite (kept in sync by triggers) or an ngram
+# FULLTEXT index on MySQL. Exact blood groups and statuses become equality
+# filters. Terms shorter than a trigram, and databases created before the
+# index existed (see `flask rebuild-search-index`), fall back to ilike.
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+REQUEST_STATUSES = ['Pending', 'Approved', 'Completed', 'Cancelled']
+MIN_FTS_TERM_LENGTH = 3
+
+# table -> (primary key column, indexed text columns)
+SEARCH_INDEXES = {
+    'donors': ('donor_id', ('name', 'email')),
+    'recipients': ('recipient_id', ('name',)),
+}
+
+def is_search_index_object(name, type_):
+    # Created by the DDL below rather than the models; keep Alembic's hands off
+    return (type_ == 'table' and '_fts' in (name or '')) or (type_ == 'index' and (name or '').startswith('ft_'))
+
+def _fts5_supported(ddl, target, bind, **kw):
+    # The trigram tokenizer ships with SQLite 3.34+
+    return bind.dialect.name == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34)
+
+def sqlite_search_ddl(table, id_col, columns):
+    cols = ', '.join(columns)
+    new_vals = ', '.join(f'new.{c}' for c in columns)
+    old_vals = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({cols}, "
+        f"content='{table}', content_rowid='{id_col}', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {table}_fts(rowid, {cols}) VALUES (new.{id_col}, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {cols}) VALUES ('delete', old.{id_col}, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {cols}) VALUES ('delete', old.{id_col}, {old_vals}); "
+        f"INSERT INTO {table}_fts(rowid, {cols}) VALUES (new.{id_col}, {new_vals}); END",
+    ]
+
+def mysql_search_ddl(table, columns):
+    return f"ALTER TABLE {table} ADD FULLTEXT INDEX ft_{table} ({', '.join(columns)}) WITH PARSER ngram"
+
+for _table_name, (_id_col, _columns) in SEARCH_INDEXES.items():
+    _table = db.metadata.tables[_table_name]
+    for _statement in sqlite_search_ddl(_table_name, _id_col, _columns):
+        event.listen(_table, 'after_create', db.DDL(_statement).execute_if(callable_=_fts5_supported))
+    event.listen(_table, 'after_create',
+                    db.DDL(mysql_search_ddl(_table_name, _columns)).execute_if(dialect='mysql'))
+
+_search_index_ready = {}
+
+def has_search_index(table):
+    if table not in _search_index_ready:
+        inspector = db.inspect(db.engine)
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            ready = inspector.has_table(f'{table}_fts')
+        elif dialect == 'mysql':
+            ready = any(ix['name'] == f'ft_{table}' for ix in inspector.get_indexes(table))
+        else:
+            ready = False
+        _search_index_ready[table] = ready
+    return _search_index_ready[table]
+
+def text_search_clause(model, term):
+    table = model.__tablename__
+    id_name, columns = SEARCH_INDEXES[table]
+    # Quoted phrase: matches the term as a substring, like the old ilike did
+    phrase = '"' + term.replace('"', '""') + '"'
+
+    if len(term) >= MIN_FTS_TERM_LENGTH and has_search_index(table):
+        if db.engine.dialect.name == 'sqlite':
+            fts = db.table(f'{table}_fts', db.column('rowid'))
+            matches = db.select(fts.c.rowid).where(db.literal_column(f'{table}_fts').op('MATCH')(phrase))
+            return getattr(model, id_name).in_(matches)
+        qualified = ', '.join(f'{table}.{c}' for c in columns)
+        return db.text(f'MATCH ({qualified}) AGAINST (:{table}_term IN BOOLEAN MODE)') \
+            .bindparams(**{f'{table}_term': phrase})
+
+    return db.or_(
+        model.blood_group.ilike(f'%{term}%'),
+        *(getattr(model, c).ilike(f'%{term}%') for c in columns)
+    )
+
+def search_filter(model, search):
+    term = search.strip()
+    if term.upper() in BLOOD_GROUPS:
+        return model.blood_group == term.upper()
+    if hasattr(model, 'request_status') and term.title() in REQUEST_STATUSES:
+        return model.request_status == term.title()
+    return text_search_clause(model, term)
+
+def rebuild_search_index():
+    # Creates the search index if missing and reindexes every row; False if
+    # the database has no text index to build
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'mysql'):
+        return False
+    with db.engine.begin() as conn:
+        for table, (id_col, columns) in SEARCH_INDEXES.items():
+            if dialect == 'sqlite':
+                for statement in sqlite_search_ddl(table, id_col, columns):
+                    conn.execute(db.text(statement))
+                conn.execute(db.text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+            else:
+                indexes = db.inspect(conn).get_indexes(table)
+                if not any(ix['name'] == f'ft_{table}' for ix in indexes):
+                    conn.execute(db.text(mysql_search_ddl(table, columns)))
+    _search_index_ready.clear()
+    return True
+
+# Record lookup
+# Backs the search-as-you-type donor/recipient pickers so forms never load
+# every row: numeric input is a primary-key hit, longer terms go through the
+# search index and short ones use a prefix scan of the indexed name column.
+LOOKUP_LIMIT = 10
+MAX_LOOKUP_LIMIT = 25
+
+def lookup_label(name, blood_group, record_id):
+    return f'{name} ({blood_group}) · #{record_id}'
+
+def lookup_filter(model, id_col, term):
+    if term.isdigit():
+        return id_col == int(term)
+    if len(term) >= MIN_FTS_TERM_LENGTH and has_search_index(model.__tablename__):
+        return text_search_clause(model, term)
+    return model.name.startswith(term, autoescape=True)
+
+def lookup_records(model, id_col, term, limit=LOOKUP_LIMIT):
+    rows = db.session.execute(
+        db.select(id_col, model.name, model.blood_group)
+        .where(lookup_filter(model, id_col, term))
+        .order_by(model.name)
+        .limit(limit)
+    )
+    return [
+        {'id': record_id, 'name': name, 'blood_group': blood_group,
+         'text': lookup_label(name, blood_group, record_id)}
+        for record_id, name, blood_group in rows
+    ]
+
+def record_exists(id_col, record_id):
+    return db.session.query(db.exists().where(id_col == record_id)).scalar()
+
+def selected_label(model, record_id):
+    # Label for a picker's current value, e.g. when re-rendering a failed POST
+    record = db.session.get(model, record_id) if record_id else None
+    if record is None:
+        return ''
+    return lookup_label(record.name, record.blood_group, record_id)
+
+# Keyset pagination
+# Opt-in alternative to .paginate() for large tables: ?after=<created_at,id>
+# seeks straight to the next page through the (created_at, id) index instead
+# of counting the whole table and skipping OFFSET rows. An empty ?after=
+# starts from the newest row.
+PER_PAGE = 10
+
+class KeysetPage:
+    def __init__(self, items, per_page, next_cursor):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        # Totals are deliberately unknown: computing them is the cost we avoid
+        self.total = None
+        self.pages = None
+
+def encode_cursor(created_at, row_id):
+    return f'{created_at.isoformat()},{row_id}'
+
+def decode_cursor(cursor):
+    created_at, _, row_id = cursor.rpartition(',')
+    return datetime.fromisoformat(created_at), int(row_id)
+
+def keyset_paginate(query, created_col, id_col, after, per_page=PER_PAGE):
+    query = query.order_by(created_col.desc(), id_col.desc())
+    if after:
+        created_at, row_id = decode_cursor(after)
+        query = query.filter(db.or_(
+            created_col < created_at,
+            db.and_(created_col == created_at, id_col < row_id)
+        ))
+
+    # Fetch one extra row to learn whether a next page exists
+    items = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return KeysetPage(items, per_page, next_cursor)
+
 # Forms
 class DonorForm(FlaskForm):
     name = StringField('Name', validators=[DataRequired(), Length(min=2, max=100)])
@@ -105,40 +1183,857 @@ class RecipientForm(FlaskForm):
     ], validators=[DataRequired()])
 
 class DonationForm(FlaskForm):
-    donor_id = SelectField('Donor', coerce=int, validators=[DataRequired()])
+    donor_id = IntegerField('Donor', widget=HiddenInput(), validators=[DataRequired(message='Select a donor')])
     donation_date = DateField('Donation Date', validators=[DataRequired()])
     blood_volume_ml = IntegerField('Blood Volume (ml)', validators=[DataRequired(), NumberRange(min=100, max=500)])
     hospital = StringField('Hospital', validators=[DataRequired(), Length(max=100)])
 
+    def validate_donor_id(self, field):
+        if not record_exists(Donor.donor_id, field.data):
+            raise ValidationError('Select a registered donor')
+
 class BloodRequestForm(FlaskForm):
-    recipient_id = SelectField('Recipient', coerce=int, validators=[DataRequired()])
+    recipient_id = IntegerField('Recipient', widget=HiddenInput(), validators=[DataRequired(message='Select a recipient')])
     blood_group = SelectField('Blood Group', choices=[
         ('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'),
         ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')
     ], validators=[DataRequired()])
     quantity_needed_ml = IntegerField('Quantity Needed (ml)', validators=[DataRequired(), NumberRange(min=100, max=2000)])
 
+    def validate_recipient_id(self, field):
+        if not record_exists(Recipient.recipient_id, field.data):
+            raise ValidationError('Select a registered recipient')
+
+# Each unit becomes a row, so one manual update adds at most this many
+MAX_INVENTORY_UNITS = 100
+
+class InventoryUpdateForm(FlaskForm):
+    blood_group = SelectField('Blood Group', choices=[
+        ('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'),
+        ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')
+    ], validators=[DataRequired()])
+    units = IntegerField('Units', validators=[InputRequired(), NumberRange(min=0, max=MAX_INVENTORY_UNITS)])
+
+# Duplicate detection
+# Donors and recipients carry normalized phone_key/email_key columns (set by
+# the models' validators, or contact_keys() for bulk inserts), so checking a
+# new or edited record against everyone already registered is one probe of
+# those indexes, made under lock_contacts() so it holds until the insert
+# commits. Existing duplicates are found by blocking on the same keys:
+# only keys shared by two or more rows are read (a GROUP BY over the index),
+# and a union-find joins blocks that share a record, so the cost grows with
+# the table plus the duplicates, never with every pair of rows.
+# merge_records() folds duplicates into one record and re-points their
+# donations or blood requests.
+PHONE_KEY_DIGITS = 10
+
+def normalize_phone(phone):
+    # Digits only, compared on the trailing national number so "+91 98450
+    # 12345", "098450-12345" and "9845012345" are the same phone
+    digits = ''.join(c for c in phone or '' if c.isdigit())
+    return digits[-PHONE_KEY_DIGITS:] or None
+
+def normalize_email(email):
+    # Case-insensitive, ignoring "+tag" sub-addresses
+    local, _, domain = (email or '').strip().lower().partition('@')
+    if not domain:
+        return local or None
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+CONTACT_NORMALIZERS = {'phone': normalize_phone, 'email': normalize_email}
+
+def contact_keys(mapping):
+    # phone_key/email_key for a row inserted without the ORM
+    return {'phone_key': normalize_phone(mapping['phone']), 'email_key': normalize_email(mapping['email'])}
+
+DEDUPE_ENTITIES = {'donors': Donor, 'recipients': Recipient}
+
+def primary_key(model):
+    return model.__table__.primary_key.columns.values()[0]
+
+def lock_contacts(model):
+    # Held until commit, so two writers cannot both pass the duplicate check
+    # and then insert the same phone or email. SQLite takes its database
+    # write lock with a no-op write, PostgreSQL a table lock that still lets
+    # readers through; elsewhere the probes' FOR UPDATE locks the index
+    # ranges they read (InnoDB next-key locks)
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        table = model.__table__
+        db.session.execute(db.update(table).where(db.false()).values(phone_key=table.c.phone_key))
+    elif dialect == 'postgresql':
+        db.session.execute(db.text(f'LOCK TABLE {model.__tablename__} IN SHARE ROW EXCLUSIVE MODE'))
+
+def find_duplicate(model, phone, email, exclude_id=None):
+    pk = primary_key(model)
+    lock_contacts(model)
+    query = db.select(model).where(db.or_(model.phone_key == normalize_phone(phone),
+                                          model.email_key == normalize_email(email)))
+    if exclude_id is not None:
+        query = query.where(pk != exclude_id)
+    return db.session.execute(query.order_by(pk).limit(1).with_for_update()).scalar()
+
+def duplicate_errors(model, phone, email, exclude_id=None):
+    # field -> [message], like form.errors
+    duplicate = find_duplicate(model, phone, email, exclude_id)
+    if duplicate is None:
+        return {}
+    message = f'Already registered to {model.__name__.lower()} #{getattr(duplicate, primary_key(model).key)} ' \
+              f'({duplicate.name})'
+    errors = {}
+    if duplicate.phone_key == normalize_phone(phone):
+        errors['phone'] = [message]
+    if duplicate.email_key == normalize_email(email):
+        errors['email'] = [message]
+    return errors
+
+def flag_duplicate(form, model, exclude_id=None):
+    # Adds the duplicate errors to the form's fields; True if there were any
+    errors = duplicate_errors(model, form.phone.data, form.email.data, exclude_id)
+    for field, messages in errors.items():
+        form[field].errors.extend(messages)
+    return bool(errors)
+
+def batch_duplicates(model, mappings, labels):
+    # index -> message for every mapping that matches a stored record or an
+    # earlier mapping (named by labels[index]); one indexed query per batch
+    pk = primary_key(model)
+    label = model.__name__.lower()
+    lock_contacts(model)
+    stored = db.session.execute(
+        db.select(pk, model.phone_key, model.email_key)
+        .where(db.or_(model.phone_key.in_({m['phone_key'] for m in mappings if m['phone_key']}),
+                      model.email_key.in_({m['email_key'] for m in mappings if m['email_key']})))
+        .with_for_update()
+    ).all()
+    # (field, key) -> stored id / index of the first mapping using it
+    stored_owners = {('phone', row.phone_key): row[0] for row in stored}
+    stored_owners.update({('email', row.email_key): row[0] for row in stored})
+    batch_owners = {}
+
+    duplicates = {}
+    for index, mapping in enumerate(mappings):
+        keys = [(field, mapping[f'{field}_key']) for field in ('phone', 'email') if mapping[f'{field}_key']]
+        stored_id = next((stored_owners[key] for key in keys if key in stored_owners), None)
+        earlier = next((batch_owners[key] for key in keys if key in batch_owners), None)
+        if stored_id is not None:
+            duplicates[index] = f'Already registered to {label} #{stored_id}'
+        elif earlier is not None:
+            duplicates[index] = f'Same phone or email as {labels[earlier]}'
+        else:
+            batch_owners.update((key, index) for key in keys)
+    return duplicates
+
+def duplicate_clusters(model):
+    # Lists of ids that share a phone or email (directly or through another
+    # record), oldest id first
+    pk = primary_key(model)
+    parent = {}
+
+    def find(record_id):
+        parent.setdefault(record_id, record_id)
+        while parent[record_id] != record_id:
+            parent[record_id] = parent[parent[record_id]]
+            record_id = parent[record_id]
+        return record_id
+
+    for key_column in (model.phone_key, model.email_key):
+        shared = (db.select(key_column).where(key_column.isnot(None))
+                  .group_by(key_column).having(db.func.count() > 1))
+        rows = db.session.execute(
+            db.select(key_column, pk).where(key_column.in_(shared)).order_by(key_column, pk)
+        )
+        for _, block in itertools.groupby(rows, key=lambda row: row[0]):
+            first, *others = [find(row[1]) for row in block]
+            for other in others:
+                parent[find(other)] = find(first)
+
+    clusters = {}
+    for record_id in parent:
+        clusters.setdefault(find(record_id), []).append(record_id)
+    return sorted(sorted(ids) for ids in clusters.values())
+
+def merge_records(entity, keep_id, duplicate_ids):
+    # Folds duplicate_ids into keep_id: their donations (or blood requests),
+    # archived ones included, move to the kept record, then the duplicates
+    # are deleted
+    model = DEDUPE_ENTITIES[entity]
+    pk = primary_key(model)
+    duplicate_ids = sorted(set(duplicate_ids) - {keep_id})
+    keep = db.session.get(model, keep_id)
+    duplicates = model.query.filter(pk.in_(duplicate_ids)).all() if duplicate_ids else []
+    if keep is None or len(duplicates) != len(duplicate_ids):
+        raise ValueError(f'Unknown {entity} id(s)')
+    if entity == 'donors':
+        # Donations are counted under their donor's blood group
+        mismatched = [d.donor_id for d in duplicates if d.blood_group != keep.blood_group]
+        if mismatched:
+            raise ValueError(f'Blood group differs for donor(s) {", ".join(map(str, mismatched))}')
+        dates = [d.last_donation_date for d in [keep] + duplicates if d.last_donation_date]
+        keep.last_donation_date = max(dates) if dates else None
+
+    for reference in DEPENDENTS[entity]:
+        db.session.execute(
+            db.update(reference.table).where(reference.in_(duplicate_ids)).values({reference.key: keep_id})
+        )
+    for duplicate in duplicates:
+        soft_delete(duplicate)
+    bump_stats(**{entity: -len(duplicate_ids)})
+    return len(duplicate_ids)
+
+def same_person(records):
+    names = {' '.join(r.name.lower().split()) for r in records}
+    return len(names) == 1
+
+# Soft delete and archival
+# Deleting a donor, recipient, donation or request only stamps deleted_at,
+# and every ORM SELECT gets a "deleted_at IS NULL" criteria from the hook
+# below, so deleted rows drop out of lists, lookups, counts and duplicate
+# checks but can still be recovered. Old history leaves the hot tables:
+# archive_records() moves donations older than ARCHIVE_AFTER_DAYS and
+# closed requests created before then into donations_archive and
+# blood_requests_archive, ARCHIVE_BATCH_SIZE rows per transaction, and
+# takes them off the dashboard counters, which count the live working set.
+# Lists only read the archive when asked to (?archived=1), through a UNION
+# ALL of both tables; the reports read the rollups and keep all history.
+ARCHIVE_BATCH_SIZE = 1000
+CLOSED_REQUEST_STATUSES = ('Completed', 'Cancelled')
+
+@event.listens_for(db.session, 'do_orm_execute')
+def hide_deleted_rows(orm_execute_state):
+    # Column loads refresh rows already loaded and must still find them
+    if orm_execute_state.is_select and not orm_execute_state.is_column_load \
+            and not orm_execute_state.execution_options.get('include_deleted', False):
+        orm_execute_state.statement = orm_execute_state.statement.options(db.with_loader_criteria(
+            SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True))
+
+def soft_delete(record):
+    record.deleted_at = datetime.utcnow()
+
+# entity -> (live model, archive model, rows that may be archived)
+ARCHIVES = {
+    'donations': (Donation, DonationArchive,
+                  lambda cutoff: Donation.donation_date < cutoff.date()),
+    'requests': (BloodRequest, BloodRequestArchive,
+                 lambda cutoff: db.and_(BloodRequest.status.in_(CLOSED_REQUEST_STATUSES),
+                                        BloodRequest.created_at < cutoff)),
+}
+ARCHIVE_MODELS = {model: archive for model, archive, _ in ARCHIVES.values()}
+
+# entity -> columns of the live and archived rows that reference it
+DEPENDENTS = {
+    'donors': (Donation.donor_id, DonationArchive.donor_id),
+    'recipients': (BloodRequest.recipient_id, BloodRequestArchive.recipient_id),
+}
+
+def has_dependents(entity, record_id):
+    return any(record_exists(column, record_id) for column in DEPENDENTS[entity])
+
+def list_source(model, include_archived):
+    # (entity, loader options) to list model's live rows, or its live and
+    # archived rows with .archived telling them apart
+    if not include_archived:
+        return model, ()
+    archive = ARCHIVE_MODELS[model]
+    columns = [column.name for column in model.__table__.columns]
+    # Each branch filters its own deleted rows so it can use its index
+    rows = db.union_all(
+        db.select(*model.__table__.columns, db.literal(False).label('archived'))
+        .where(model.__table__.c.deleted_at.is_(None)),
+        db.select(*(archive.__table__.c[name] for name in columns), db.literal(True).label('archived'))
+        .where(archive.__table__.c.deleted_at.is_(None)),
+    ).subquery()
+    source = db.aliased(model, rows, adapt_on_names=True)
+    return source, (db.with_expression(source.archived, rows.c.archived),)
+
+def archive_batch(entity, cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    # Moves up to batch_size rows in one transaction; returns how many moved
+    model, archive, archivable = ARCHIVES[entity]
+    table = model.__table__
+    pk = primary_key(model)
+    # The newest row always stays: SQLite hands out max(id) + 1, so
+    # archiving it would let a new row reuse an archived id
+    newest = db.select(db.func.max(pk)).scalar_subquery()
+    ids = db.session.scalars(
+        db.select(pk).where(archivable(cutoff), pk < newest).limit(batch_size)
+        .execution_options(include_deleted=True)
+    ).all()
+    if not ids:
+        return 0
+
+    columns = [column.name for column in table.columns]
+    db.session.execute(archive.__table__.insert().from_select(
+        columns + ['archived_at'],
+        db.select(*table.columns, db.literal(datetime.utcnow(), db.DateTime)).where(pk.in_(ids))
+    ))
+    live = db.session.scalar(
+        db.select(db.func.count()).select_from(table).where(pk.in_(ids), table.c.deleted_at.is_(None))
+    )
+    db.session.execute(db.delete(table).where(pk.in_(ids)))
+    bump_stats(**{entity: -live})
+    db.session.commit()
+    return len(ids)
+
+def archive_records(days=None, batch_size=ARCHIVE_BATCH_SIZE):
+    # Returns entity -> rows moved
+    days = days or current_app.config['ARCHIVE_AFTER_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    moved = {}
+    for entity in ARCHIVES:
+        moved[entity] = 0
+        while True:
+            batch = archive_batch(entity, cutoff, batch_size)
+            moved[entity] += batch
+            if batch < batch_size:
+                break
+    return moved
+
+@periodic_job('archive_records', 'ARCHIVE_INTERVAL')
+def archive_records_job(payloads):
+    archive_records()
+
+# Donations
+def record_donation(donation):
+    # Adds a donation with the side effects the next page must already show
+    # (the donor's last donation date, the dashboard counter) and queues
+    # stocking its blood units and the daily rollup
+    donor = db.session.get(Donor, donation.donor_id)
+    donor.last_donation_date = donation.donation_date
+    donation.blood_group = donor.blood_group
+    
+    db.session.add(donation)
+    db.session.flush()
+    
+    enqueue_job('stock_donation', {
+        'donation_id': donation.donation_id,
+        'blood_group': donor.blood_group,
+        'volume_ml': donation.blood_volume_ml,
+        'donation_date': donation.donation_date.isoformat(),
+        'hospital': donation.hospital,
+    }, key=f'donation:{donation.donation_id}')
+    bump_stats(donations=1)
+
+# Bulk import
+# Streams CSV or JSON Lines files into the database in batches. Each row is
+# validated by the same WTForms class the add pages use; valid rows are
+# inserted with one executemany per batch, and the side effects of a donation
+# (inventory, last_donation_date, counters) are applied once per batch rather
+# than once per row. Bad rows are reported and skipped, never fatal.
+IMPORT_BATCH_SIZE = 1000
+
+class DonationImportForm(DonationForm):
+    # Donor ids are checked set-wise per batch instead of one EXISTS per row
+    def validate_donor_id(self, field):
+        pass
+
+IMPORTERS = {
+    'donors': (DonorForm, Donor),
+    'recipients': (RecipientForm, Recipient),
+    'donations': (DonationImportForm, Donation),
+}
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, line_no, message):
+        self.errors.append((line_no, message))
+
+def read_import_rows(path):
+    # Yields (line number, row dict) without loading the whole file
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_no, e
+        else:
+            # Line 1 is the CSV header
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+
+def validate_record(form_class, values):
+    # Runs a plain dict through the same WTForms class the HTML pages use
+    formdata = MultiDict({k: '' if v is None else str(v) for k, v in values.items()})
+    form = form_class(formdata=formdata, meta={'csrf': False})
+    if form.validate():
+        return form.data, None
+    return None, form.errors
+
+def validate_import_row(form_class, row):
+    data, errors = validate_record(form_class, row)
+    if errors:
+        return None, '; '.join(f'{name}: {", ".join(messages)}' for name, messages in errors.items())
+    return data, None
+
+def apply_donation_side_effects(mappings):
+    # executemany inserts return no ids, so imported units are not linked to their donation
+    units = []
+    latest_by_donor = {}
+    rollups = {}
+    for mapping in mappings:
+        blood_group = mapping['blood_group']
+        units.extend(unit_rows(blood_group, mapping['blood_volume_ml'], mapping['donation_date']))
+        count, volume = rollups.get((mapping['donation_date'], blood_group, mapping['hospital']), (0, 0))
+        rollups[(mapping['donation_date'], blood_group, mapping['hospital'])] = \
+            (count + 1, volume + mapping['blood_volume_ml'])
+        latest = latest_by_donor.get(mapping['donor_id'])
+        if latest is None or mapping['donation_date'] > latest:
+            latest_by_donor[mapping['donor_id']] = mapping['donation_date']
+
+    stock_units(units, 'import')
+    for (day, blood_group, hospital), (count, volume) in rollups.items():
+        bump_rollup(DonationRollup, {'day': day, 'blood_group': blood_group, 'hospital': hospital},
+                    donations=count, volume_ml=volume)
+
+    if latest_by_donor:
+        db.session.execute(
+            db.update(Donor.__table__)
+            .where(Donor.donor_id == db.bindparam('b_donor_id'))
+            .where(db.or_(Donor.last_donation_date.is_(None),
+                          Donor.last_donation_date < db.bindparam('b_date')))
+            .values(last_donation_date=db.bindparam('b_date')),
+            [{'b_donor_id': donor_id, 'b_date': donation_date}
+             for donor_id, donation_date in latest_by_donor.items()]
+        )
+
+def import_batch(entity, model, batch, report):
+    # batch is a list of (line number, validated mapping)
+    if entity == 'donations':
+        donor_ids = {mapping['donor_id'] for _, mapping in batch}
+        donors = dict(db.session.execute(
+            db.select(Donor.donor_id, Donor.blood_group).where(Donor.donor_id.in_(donor_ids))
+        ).all())
+        for line_no, mapping in batch:
+            if mapping['donor_id'] not in donors:
+                report.add_error(line_no, f"donor_id: No donor with id {mapping['donor_id']}")
+        batch = [(line_no, mapping) for line_no, mapping in batch if mapping['donor_id'] in donors]
+        # Imported donations are counted in the rollups right away
+        for _, mapping in batch:
+            mapping.update(blood_group=donors[mapping['donor_id']], rolled_up=True)
+    elif entity in DEDUPE_ENTITIES:
+        for _, mapping in batch:
+            mapping.update(contact_keys(mapping))
+        duplicates = batch_duplicates(model, [mapping for _, mapping in batch],
+                                      [f'line {line_no}' for line_no, _ in batch])
+        for index, message in duplicates.items():
+            report.add_error(batch[index][0], f'Duplicate: {message}')
+        batch = [item for index, item in enumerate(batch) if index not in duplicates]
+
+    mappings = [mapping for _, mapping in batch]
+    if not mappings:
+        return
+
+    try:
+        db.session.execute(db.insert(model), mappings)
+        if entity == 'donations':
+            apply_donation_side_effects(mappings)
+        bump_stats(**{entity: len(mappings)})
+        db.session.commit()
+        report.imported += len(mappings)
+    except Exception as e:
+        db.session.rollback()
+        for line_no, _ in batch:
+            report.add_error(line_no, f'Batch failed: {e}')
+
+def import_records(entity, rows, batch_size=IMPORT_BATCH_SIZE):
+    form_class, model = IMPORTERS[entity]
+    report = ImportReport()
+    batch = []
+
+    for line_no, row in rows:
+        if isinstance(row, Exception):
+            report.add_error(line_no, f'Unreadable row: {row}')
+            continue
+        mapping, error = validate_import_row(form_class, row)
+        if error:
+            report.add_error(line_no, error)
+            continue
+        batch.append((line_no, mapping))
+        if len(batch) >= batch_size:
+            import_batch(entity, model, batch, report)
+            batch = []
+
+    import_batch(entity, model, batch, report)
+    return report
+
+# Blood matching
+# Red-cell compatibility: recipient group -> donor groups it can receive,
+# in order of preference (exact match first, O- last to conserve the
+# universal donor). Matching a batch of requests loads the 8 inventory rows
+# and at most one donor query per compatible group, however many requests
+# are in the batch.
+UNIT_VOLUME_ML = 450
+DONATION_DEFERRAL_DAYS = 56
+MATCH_DONOR_LIMIT = 5
+MATCH_REQUEST_LIMIT = 100
+
+COMPATIBLE_DONORS = {
+    'O-': ['O-'],
+    'O+': ['O+', 'O-'],
+    'A-': ['A-', 'O-'],
+    'A+': ['A+', 'A-', 'O+', 'O-'],
+    'B-': ['B-', 'O-'],
+    'B+': ['B+', 'B-', 'O+', 'O-'],
+    'AB-': ['AB-', 'A-', 'B-', 'O-'],
+    'AB+': ['AB+', 'AB-', 'A+', 'A-', 'B+', 'B-', 'O+', 'O-'],
+}
+
+def units_needed(quantity_ml):
+    return math.ceil(quantity_ml / UNIT_VOLUME_ML)
+
+def eligibility_cutoff(today=None):
+    return (today or date.today()) - timedelta(days=DONATION_DEFERRAL_DAYS)
+
+# Eligible donors
+# Per blood group, the ids of donors outside the deferral window are loaded
+# from the (blood_group, last_donation_date) index into a compact array and
+# kept for ELIGIBILITY_REFRESH_INTERVAL seconds, so call-out lists page
+# through memory. Donors who donated since the last refresh are dropped when
+# a page is loaded.
+class EligibleDonorCache:
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def _load(self, blood_group):
+        # Never-donated donors first, then whoever donated longest ago
+        ids = db.session.execute(
+            db.select(Donor.donor_id)
+            .where(Donor.blood_group == blood_group)
+            .where(db.or_(Donor.last_donation_date.is_(None),
+                          Donor.last_donation_date <= eligibility_cutoff()))
+            .order_by(Donor.last_donation_date.asc(), Donor.donor_id)
+        ).scalars()
+        return array('q', ids)
+
+    def get(self, blood_group):
+        # Returns (refreshed_at, donor ids)
+        ttl = current_app.config['ELIGIBILITY_REFRESH_INTERVAL']
+        entry = self._groups.get(blood_group)
+        if entry is None or time.time() - entry[0] > ttl:
+            with self._lock:
+                entry = self._groups.get(blood_group)
+                if entry is None or time.time() - entry[0] > ttl:
+                    entry = (time.time(), self._load(blood_group))
+                    self._groups[blood_group] = entry
+        return entry
+
+    def clear(self):
+        self._groups.clear()
+
+eligible_donor_cache = EligibleDonorCache()
+
+def load_eligible_donors(donor_ids):
+    # Hydrates a page of cached ids in cache order, skipping anyone who has
+    # donated since the cache was built
+    donors = {d.donor_id: d for d in Donor.query.filter(Donor.donor_id.in_(donor_ids))}
+    cutoff = eligibility_cutoff()
+    return [donors[i] for i in donor_ids
+            if i in donors and (donors[i].last_donation_date is None or donors[i].last_donation_date <= cutoff)]
+
+def eligible_donors(blood_group, limit):
+    _, donor_ids = eligible_donor_cache.get(blood_group)
+    return load_eligible_donors(list(donor_ids[:limit]))
+
+def match_requests(blood_requests, donor_limit=MATCH_DONOR_LIMIT):
+    stock = {inv.blood_group: inv.total_units for inv in BloodInventory.query.all()}
+    groups = {g for r in blood_requests for g in COMPATIBLE_DONORS.get(r.blood_group, [])}
+    donors_by_group = {g: eligible_donors(g, donor_limit) for g in groups}
+
+    matches = []
+    for blood_request in blood_requests:
+        compatible = COMPATIBLE_DONORS.get(blood_request.blood_group, [])
+        donors = [d for g in compatible for d in donors_by_group[g]][:donor_limit]
+        matches.append({
+            'request_id': blood_request.request_id,
+            'blood_group': blood_request.blood_group,
+            'units_needed': units_needed(blood_request.quantity_needed_ml),
+            'status': blood_request.status,
+            'stock': [{'blood_group': g, 'units_available': stock[g]}
+                      for g in compatible if stock.get(g, 0) > 0],
+            'donors': [{'donor_id': d.donor_id, 'name': d.name, 'blood_group': d.blood_group,
+                        'phone': d.phone,
+                        'last_donation_date': d.last_donation_date.isoformat() if d.last_donation_date else None}
+                       for d in donors],
+        })
+    return matches
+
+ALLOCATION_ATTEMPTS = 3
+
+class AllocationConflict(Exception):
+    pass
+
+def auto_allocate_pending():
+    # Oldest requests first; a request is approved only if unexpired
+    # compatible units cover it completely, and it gets the units that
+    # expire first. A pass that loses a race with a concurrent one is
+    # rolled back to its savepoint and planned again from fresh reads.
+    for attempt in range(ALLOCATION_ATTEMPTS):
+        try:
+            with db.session.begin_nested():
+                return allocate_pending_once()
+        except AllocationConflict:
+            if attempt == ALLOCATION_ATTEMPTS - 1:
+                raise
+
+def lock_inventory():
+    # Serializes allocation passes before anything is read. SQLite has no
+    # row locks (FOR UPDATE is dropped), so a no-op write takes its database
+    # write lock instead; reading first and writing later would let two
+    # passes plan on the same stock, or deadlock upgrading their read locks
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(
+            db.update(BloodInventory).values(total_units=BloodInventory.total_units)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        BloodInventory.query.with_for_update().all()
+
+def allocate_pending_once():
+    # The writes are still guarded on the state the plan was made from, for
+    # writers that do not take the lock (request edits, the expiry sweeper)
+    lock_inventory()
+    stock = usable_stock()
+    pending = BloodRequest.query.filter_by(status='Pending') \
+        .order_by(BloodRequest.created_at, BloodRequest.request_id).all()
+
+    approved = []
+    taken_by_group = {}
+    allocations = []
+    movements = []
+    fulfilled_by_day = {}
+    for blood_request in pending:
+        needed = units_needed(blood_request.quantity_needed_ml)
+        takes = {}
+        for group in COMPATIBLE_DONORS.get(blood_request.blood_group, []):
+            take = min(needed, stock.get(group, 0))
+            if take:
+                takes[group] = take
+                needed -= take
+            if not needed:
+                break
+        if needed:
+            continue
+
+        for group, take in takes.items():
+            stock[group] -= take
+            taken_by_group[group] = taken_by_group.get(group, 0) + take
+            allocations.append((blood_request.request_id, group, take))
+            movements.append({'blood_group': group, 'units': -take, 'reason': 'allocation',
+                              'request_id': blood_request.request_id, 'created_at': datetime.utcnow()})
+        approved.append(blood_request.request_id)
+        rollup_key = (blood_request.created_at.date(), blood_request.blood_group)
+        fulfilled_by_day[rollup_key] = fulfilled_by_day.get(rollup_key, 0) + 1
+
+    if approved:
+        # Claim the requests first: a concurrent pass that approved any of
+        # them leaves fewer than planned still pending
+        claimed = db.session.execute(
+            db.update(BloodRequest)
+            .where(BloodRequest.request_id.in_(approved), BloodRequest.status == 'Pending')
+            .values(status='Approved')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed != len(approved):
+            raise AllocationConflict('Pending requests changed during allocation; try again')
+
+    # One FEFO read per group, then hand the units out in request order
+    queues = {group: iter(fefo_units(group, units)) for group, units in taken_by_group.items()}
+    assignments = [{'b_unit_id': unit_id, 'b_request_id': request_id}
+                   for request_id, group, take in allocations
+                   for unit_id in itertools.islice(queues[group], take)]
+    moved = 0
+    if assignments:
+        # Only units still available move, as in retire_units(); a unit a
+        # concurrent sweep or allocation took first leaves the count short
+        moved = db.session.execute(
+            db.update(BloodUnit.__table__)
+            .where(BloodUnit.unit_id == db.bindparam('b_unit_id'), BloodUnit.status == 'Available')
+            .values(status='Allocated', request_id=db.bindparam('b_request_id')),
+            assignments
+        ).rowcount
+    if moved != sum(taken_by_group.values()):
+        raise AllocationConflict('Blood units changed during allocation; try again')
+    for group, units in taken_by_group.items():
+        increment_inventory(group, -units)
+        check_low_stock(group)
+    if movements:
+        db.session.execute(db.insert(InventoryMovement), movements)
+    for (day, blood_group), fulfilled in fulfilled_by_day.items():
+        bump_rollup(RequestRollup, {'day': day, 'blood_group': blood_group}, fulfilled=fulfilled)
+    return approved, len(pending) - len(approved)
+
+# Public columns
+# What the JSON API and the exports show of each table, and all ?fields=
+# may ask for. The normalized contact keys and the soft-delete stamp are
+# internal.
+PUBLIC_COLUMNS = {
+    Donor: ('donor_id', 'name', 'age', 'gender', 'blood_group', 'phone', 'email', 'address',
+            'last_donation_date', 'created_at'),
+    Recipient: ('recipient_id', 'name', 'age', 'gender', 'blood_group', 'phone', 'email', 'address',
+                'request_status', 'created_at'),
+    Donation: ('donation_id', 'donor_id', 'donation_date', 'blood_volume_ml', 'hospital', 'created_at'),
+    BloodRequest: ('request_id', 'recipient_id', 'blood_group', 'quantity_needed_ml', 'status', 'created_at'),
+    BloodInventory: ('inventory_id', 'blood_group', 'total_units', 'last_updated'),
+}
+
+# Export
+# Rows are streamed straight from a server-side cursor in EXPORT_CHUNK_SIZE
+# partitions and written out as they arrive, so memory stays flat no matter
+# how large the table is.
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORTS = {
+    'donors': Donor,
+    'recipients': Recipient,
+    'donations': Donation,
+    'requests': BloodRequest,
+    'inventory': BloodInventory,
+}
+
+def export_statement(entity, search='', status=''):
+    model = EXPORTS[entity]
+    table = model.__table__
+    stmt = db.select(*(table.c[name] for name in PUBLIC_COLUMNS[model]))
+    if 'deleted_at' in table.c:
+        stmt = stmt.where(table.c.deleted_at.is_(None))
+    if search and entity in ('donors', 'recipients'):
+        stmt = stmt.where(search_filter(model, search))
+    elif search and entity == 'donations':
+        stmt = stmt.join(Donor, Donation.donor_id == Donor.donor_id).where(search_filter(Donor, search))
+    if status and entity == 'requests':
+        stmt = stmt.where(BloodRequest.status == status)
+    return stmt.order_by(*model.__table__.primary_key.columns)
+
+def export_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def stream_csv(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([export_value(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_json(columns, partitions):
+    yield '['
+    separator = ''
+    for rows in partitions:
+        chunk = ','.join(json.dumps({c: export_value(v) for c, v in zip(columns, row)}) for row in rows)
+        if chunk:
+            yield separator + chunk
+            separator = ','
+    yield ']'
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+# Request metrics
+# Cheap enough to leave on in production: every request records its latency,
+# the number and total time of the SQL statements it ran (cursor events) and
+# its template render time into fixed-bucket histograms, at the cost of a few
+# perf_counter() calls and one short lock. Statements slower than
+# SLOW_QUERY_MS are logged with their endpoint. /metrics serves the
+# per-process numbers in the Prometheus text format (the registry is in
+# metrics.py); for streamed responses (exports, SSE) latency is the time to
+# the first byte.
+def request_labels():
+    return (('endpoint', request.endpoint or 'unmatched'), ('method', request.method))
+
+@main.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+    g.render_seconds = 0.0
+
+@main.after_app_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    labels = request_labels()
+    request_metrics.observe('http_request_duration_seconds', labels, time.perf_counter() - started)
+    request_metrics.inc('http_requests_total', labels + (('status', str(response.status_code)),))
+    request_metrics.observe('db_queries_per_request', labels, g.sql_queries, QUERY_COUNT_BUCKETS)
+    request_metrics.observe('db_query_seconds_per_request', labels, g.sql_seconds)
+    if g.render_seconds:
+        request_metrics.observe('template_render_seconds', labels, g.render_seconds)
+    return response
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('query_started', time.perf_counter())
+    if not has_app_context():
+        # Engines used outside the app (scripts, other apps in the process)
+        # have no config or logger to report to
+        return
+    in_request = has_request_context() and 'request_started' in g
+    if in_request:
+        g.sql_queries += 1
+        g.sql_seconds += elapsed
+    if elapsed * 1000 >= current_app.config['SLOW_QUERY_MS']:
+        where = request_labels()[0][1] if in_request else 'background'
+        request_metrics.inc('db_slow_queries_total', (('endpoint', where),))
+        current_app.logger.warning('Slow query (%.0f ms) in %s: %s', elapsed * 1000, where,
+                                   ' '.join(statement.split())[:500])
+
+@before_render_template.connect
+def start_render_timer(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+@template_rendered.connect
+def record_render_time(sender, template, context, **extra):
+    started = g.pop('render_started', None)
+    if started is not None and 'request_started' in g:
+        g.render_seconds += time.perf_counter() - started
+
+@main.route('/metrics')
+def metrics():
+    body = request_metrics.render()
+    with _pool_metrics_lock:
+        pool = dict(pool_metrics)
+    body += ''.join(f'# TYPE db_pool_{name} gauge\ndb_pool_{name} {value}\n' for name, value in sorted(pool.items()))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 # Routes
-@app.route('/')
+@main.route('/')
 def home():
     try:
         # Get summary statistics
-        total_donors = Donor.query.count()
-        total_recipients = Recipient.query.count()
-        total_donations = Donation.query.count()
-        total_requests = BloodRequest.query.count()
+        stats = cached('stats', load_stats)['payload']
         
         # Get recent donations
-        recent_donations = Donation.query.order_by(Donation.created_at.desc()).limit(5).all()
+        recent_donations = Donation.query.options(db.joinedload(Donation.donor)) \
+            .order_by(Donation.created_at.desc()).limit(5).all()
         
         # Get blood inventory summary
-        inventory = BloodInventory.query.all()
+        inventory = get_inventory()
         
         return render_template('index.html', 
-                             total_donors=total_donors,
-                             total_recipients=total_recipients,
-                             total_donations=total_donations,
-                             total_requests=total_requests,
+                             total_donors=stats['total_donors'],
+                             total_recipients=stats['total_recipients'],
+                             total_donations=stats['total_donations'],
+                             total_requests=stats['total_requests'],
                              recent_donations=recent_donations,
                              inventory=inventory)
     except Exception as e:
@@ -151,36 +2046,34 @@ def home():
                              recent_donations=[],
                              inventory=[])
 
-@app.route('/donor/view')
+@main.route('/donor/view')
 def view_donors():
     try:
         page = request.args.get('page', 1, type=int)
+        after = request.args.get('after')
         search = request.args.get('search', '')
         
         query = Donor.query
         if search:
-            query = query.filter(
-                db.or_(
-                    Donor.name.ilike(f'%{search}%'),
-                    Donor.blood_group.ilike(f'%{search}%'),
-                    Donor.email.ilike(f'%{search}%')
-                )
-            )
+            query = query.filter(search_filter(Donor, search))
         
-        donors = query.order_by(Donor.created_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
-        )
+        if after is not None:
+            donors = keyset_paginate(query, Donor.created_at, Donor.donor_id, after)
+        else:
+            donors = query.order_by(Donor.created_at.desc()).paginate(
+                page=page, per_page=PER_PAGE, error_out=False
+            )
         
         return render_template('donor.html', donors=donors, search=search)
     except Exception as e:
         flash(f'Error loading donors: {str(e)}', 'error')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
-@app.route('/donor/add', methods=['GET', 'POST'])
+@main.route('/donor/add', methods=['GET', 'POST'])
 def add_donor():
     form = DonorForm()
     
-    if form.validate_on_submit():
+    if form.validate_on_submit() and not flag_duplicate(form, Donor):
         try:
             donor = Donor(
                 name=form.name.data,
@@ -194,26 +2087,29 @@ def add_donor():
             )
             
             db.session.add(donor)
+            bump_stats(donors=1)
             db.session.commit()
             
             flash('Donor added successfully!', 'success')
-            return redirect(url_for('view_donors'))
+            return redirect(url_for('main.view_donors'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error adding donor: {str(e)}', 'error')
     
     return render_template('adddonor.html', form=form)
 
-@app.route('/donor/edit/<int:id>', methods=['GET', 'POST'])
+@main.route('/donor/edit/<int:id>', methods=['GET', 'POST'])
 def edit_donor(id):
     try:
         donor = Donor.query.get_or_404(id)
         form = DonorForm(obj=donor)
         
-        if form.validate_on_submit():
+        if form.validate_on_submit() and not flag_duplicate(form, Donor, exclude_id=donor.donor_id):
             donor.name = form.name.data
             donor.age = form.age.data
             donor.gender = form.gender.data
+            if form.blood_group.data != donor.blood_group:
+                regroup_donations(donor.donor_id, form.blood_group.data)
             donor.blood_group = form.blood_group.data
             donor.phone = form.phone.data
             donor.email = form.email.data
@@ -222,61 +2118,60 @@ def edit_donor(id):
             
             db.session.commit()
             flash('Donor updated successfully!', 'success')
-            return redirect(url_for('view_donors'))
+            return redirect(url_for('main.view_donors'))
         
         return render_template('editdonor.html', form=form, donor=donor)
     except Exception as e:
         flash(f'Error editing donor: {str(e)}', 'error')
-        return redirect(url_for('view_donors'))
+        return redirect(url_for('main.view_donors'))
 
-@app.route('/donor/delete/<int:id>')
+@main.route('/donor/delete/<int:id>', methods=['POST'])
 def delete_donor(id):
     try:
         donor = Donor.query.get_or_404(id)
         
-        # Check if donor has donations
-        if donor.donations:
+        # Check if donor has donations, archived ones included
+        if has_dependents('donors', donor.donor_id):
             flash('Cannot delete donor with existing donations', 'error')
-            return redirect(url_for('view_donors'))
+            return redirect(url_for('main.view_donors'))
         
-        db.session.delete(donor)
+        soft_delete(donor)
+        bump_stats(donors=-1)
         db.session.commit()
         flash('Donor deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting donor: {str(e)}', 'error')
     
-    return redirect(url_for('view_donors'))
+    return redirect(url_for('main.view_donors'))
 
-@app.route('/recipient/view')
+@main.route('/recipient/view')
 def view_recipients():
     try:
         page = request.args.get('page', 1, type=int)
+        after = request.args.get('after')
         search = request.args.get('search', '')
         
         query = Recipient.query
         if search:
-            query = query.filter(
-                db.or_(
-                    Recipient.name.ilike(f'%{search}%'),
-                    Recipient.blood_group.ilike(f'%{search}%'),
-                    Recipient.request_status.ilike(f'%{search}%')
-                )
-            )
+            query = query.filter(search_filter(Recipient, search))
         
-        recipients = query.order_by(Recipient.created_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
-        )
+        if after is not None:
+            recipients = keyset_paginate(query, Recipient.created_at, Recipient.recipient_id, after)
+        else:
+            recipients = query.order_by(Recipient.created_at.desc()).paginate(
+                page=page, per_page=PER_PAGE, error_out=False
+            )
         
         return render_template('recipient.html', recipients=recipients, search=search)
     except Exception as e:
         flash(f'Error loading recipients: {str(e)}', 'error')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
-@app.route('/recipient/add', methods=['GET', 'POST'])
+@main.route('/recipient/add', methods=['GET', 'POST'])
 def add_recipient():
     form = RecipientForm()
     
-    if form.validate_on_submit():
+    if form.validate_on_submit() and not flag_duplicate(form, Recipient):
         try:
             recipient = Recipient(
                 name=form.name.data,
@@ -290,23 +2185,24 @@ def add_recipient():
             )
             
             db.session.add(recipient)
+            bump_stats(recipients=1)
             db.session.commit()
             
             flash('Recipient added successfully!', 'success')
-            return redirect(url_for('view_recipients'))
+            return redirect(url_for('main.view_recipients'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error adding recipient: {str(e)}', 'error')
     
     return render_template('add_recipient.html', form=form)
 
-@app.route('/recipient/edit/<int:id>', methods=['GET', 'POST'])
+@main.route('/recipient/edit/<int:id>', methods=['GET', 'POST'])
 def edit_recipient(id):
     try:
         recipient = Recipient.query.get_or_404(id)
         form = RecipientForm(obj=recipient)
         
-        if form.validate_on_submit():
+        if form.validate_on_submit() and not flag_duplicate(form, Recipient, exclude_id=recipient.recipient_id):
             recipient.name = form.name.data
             recipient.age = form.age.data
             recipient.gender = form.gender.data
@@ -318,54 +2214,63 @@ def edit_recipient(id):
             
             db.session.commit()
             flash('Recipient updated successfully!', 'success')
-            return redirect(url_for('view_recipients'))
+            return redirect(url_for('main.view_recipients'))
         
         return render_template('edit_recipient.html', form=form, recipient=recipient)
     except Exception as e:
         flash(f'Error editing recipient: {str(e)}', 'error')
-        return redirect(url_for('view_recipients'))
+        return redirect(url_for('main.view_recipients'))
 
-@app.route('/recipient/delete/<int:id>')
+@main.route('/recipient/delete/<int:id>', methods=['POST'])
 def delete_recipient(id):
     try:
         recipient = Recipient.query.get_or_404(id)
         
-        # Check if recipient has requests
-        if recipient.requests:
+        # Check if recipient has requests, archived ones included
+        if has_dependents('recipients', recipient.recipient_id):
             flash('Cannot delete recipient with existing blood requests', 'error')
-            return redirect(url_for('view_recipients'))
+            return redirect(url_for('main.view_recipients'))
         
-        db.session.delete(recipient)
+        soft_delete(recipient)
+        bump_stats(recipients=-1)
         db.session.commit()
         flash('Recipient deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting recipient: {str(e)}', 'error')
     
-    return redirect(url_for('view_recipients'))
+    return redirect(url_for('main.view_recipients'))
 
-@app.route('/requests/view')
+@main.route('/requests/view')
 def view_requests():
     try:
         page = request.args.get('page', 1, type=int)
+        after = request.args.get('after')
         status_filter = request.args.get('status', '')
+        archived = request.args.get('archived', type=int) == 1
         
-        query = BloodRequest.query.join(Recipient)
+        # Load each request's recipient from the same join instead of one SELECT per row
+        source, options = list_source(BloodRequest, archived)
+        query = db.session.query(source).join(source.recipient) \
+            .options(db.contains_eager(source.recipient), *options)
         if status_filter:
-            query = query.filter(BloodRequest.status == status_filter)
+            query = query.filter(source.status == status_filter)
         
-        requests = query.order_by(BloodRequest.created_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
-        )
+        if after is not None:
+            requests = keyset_paginate(query, source.created_at, source.request_id, after)
+        else:
+            requests = query.order_by(source.created_at.desc()).paginate(
+                page=page, per_page=PER_PAGE, error_out=False
+            )
         
-        return render_template('requests.html', requests=requests, status_filter=status_filter)
+        return render_template('requests.html', requests=requests, status_filter=status_filter,
+                               archived=archived)
     except Exception as e:
         flash(f'Error loading requests: {str(e)}', 'error')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
-@app.route('/requests/add', methods=['GET', 'POST'])
+@main.route('/requests/add', methods=['GET', 'POST'])
 def add_request():
     form = BloodRequestForm()
-    form.recipient_id.choices = [(r.recipient_id, r.name) for r in Recipient.query.all()]
     
     if form.validate_on_submit():
         try:
@@ -376,17 +2281,20 @@ def add_request():
             )
             
             db.session.add(request_obj)
+            rollup_request(request_obj)
+            bump_stats(requests=1)
             db.session.commit()
             
             flash('Blood request added successfully!', 'success')
-            return redirect(url_for('view_requests'))
+            return redirect(url_for('main.view_requests'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error adding request: {str(e)}', 'error')
     
-    return render_template('add_request.html', form=form)
+    return render_template('add_request.html', form=form,
+                           recipient_label=selected_label(Recipient, form.recipient_id.data))
 
-@app.route('/requests/edit/<int:request_id>', methods=['GET', 'POST'])
+@main.route('/requests/edit/<int:request_id>', methods=['GET', 'POST'])
 def edit_request(request_id):
     try:
         request_obj = BloodRequest.query.get_or_404(request_id)
@@ -394,56 +2302,73 @@ def edit_request(request_id):
         if request.method == 'POST':
             status = request.form.get('status')
             if status in ['Pending', 'Approved', 'Completed', 'Cancelled']:
+                old_status = request_obj.status
                 request_obj.status = status
+                rollup_request_status(request_obj, old_status)
                 db.session.commit()
                 flash('Request status updated successfully!', 'success')
-                return redirect(url_for('view_requests'))
+                return redirect(url_for('main.view_requests'))
         
         return render_template('edit_request.html', request_data=request_obj)
     except Exception as e:
         flash(f'Error editing request: {str(e)}', 'error')
-        return redirect(url_for('view_requests'))
+        return redirect(url_for('main.view_requests'))
 
-@app.route('/requests/delete/<int:request_id>')
+@main.route('/requests/auto-allocate', methods=['POST'])
+def auto_allocate_requests():
+    try:
+        approved, unfilled = auto_allocate_pending()
+        db.session.commit()
+        flash(f'Allocated stock to {len(approved)} request(s); {unfilled} still pending', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error allocating requests: {str(e)}', 'error')
+    
+    return redirect(url_for('main.view_requests'))
+
+@main.route('/requests/delete/<int:request_id>', methods=['POST'])
 def delete_request(request_id):
     try:
         request_obj = BloodRequest.query.get_or_404(request_id)
-        db.session.delete(request_obj)
+        rollup_request(request_obj, -1)
+        soft_delete(request_obj)
+        bump_stats(requests=-1)
         db.session.commit()
         flash('Request deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting request: {str(e)}', 'error')
     
-    return redirect(url_for('view_requests'))
+    return redirect(url_for('main.view_requests'))
 
-@app.route('/donations/view')
+@main.route('/donations/view')
 def view_donations():
     try:
         page = request.args.get('page', 1, type=int)
+        after = request.args.get('after')
         search = request.args.get('search', '')
+        archived = request.args.get('archived', type=int) == 1
         
-        query = Donation.query.join(Donor)
+        # Load each donation's donor from the same join instead of one SELECT per row
+        source, options = list_source(Donation, archived)
+        query = db.session.query(source).join(source.donor).options(db.contains_eager(source.donor), *options)
         if search:
-            query = query.filter(
-                db.or_(
-                    Donor.name.ilike(f'%{search}%'),
-                    Donor.blood_group.ilike(f'%{search}%')
-                )
-            )
+            query = query.filter(search_filter(Donor, search))
         
-        donations = query.order_by(Donation.created_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
-        )
+        if after is not None:
+            donations = keyset_paginate(query, source.created_at, source.donation_id, after)
+        else:
+            donations = query.order_by(source.created_at.desc()).paginate(
+                page=page, per_page=PER_PAGE, error_out=False
+            )
         
-        return render_template('donations.html', donations=donations, search=search)
+        return render_template('donations.html', donations=donations, search=search, archived=archived)
     except Exception as e:
         flash(f'Error loading donations: {str(e)}', 'error')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
-@app.route('/donations/add', methods=['GET', 'POST'])
+@main.route('/donations/add', methods=['GET', 'POST'])
 def add_donation():
     form = DonationForm()
-    form.donor_id.choices = [(d.donor_id, d.name) for d in Donor.query.all()]
     
     if form.validate_on_submit():
         try:
@@ -454,132 +2379,337 @@ def add_donation():
                 hospital=form.hospital.data
             )
             
-            # Update donor's last donation date
-            donor = Donor.query.get(form.donor_id.data)
-            donor.last_donation_date = form.donation_date.data
-            
-            # Update blood inventory
-            donor_obj = Donor.query.get(form.donor_id.data)
-            inventory = BloodInventory.query.filter_by(blood_group=donor_obj.blood_group).first()
-            
-            if inventory:
-                inventory.total_units += form.blood_volume_ml.data // 450  # Convert ml to units
-            else:
-                inventory = BloodInventory(
-                    blood_group=donor_obj.blood_group,
-                    total_units=form.blood_volume_ml.data // 450
-                )
-                db.session.add(inventory)
-            
-            db.session.add(donation)
+            record_donation(donation)
             db.session.commit()
             
             flash('Donation added successfully!', 'success')
-            return redirect(url_for('view_donations'))
+            return redirect(url_for('main.view_donations'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error adding donation: {str(e)}', 'error')
     
-    return render_template('add_donation.html', form=form)
+    return render_template('add_donation.html', form=form,
+                           donor_label=selected_label(Donor, form.donor_id.data))
 
-@app.route('/donations/edit/<int:id>', methods=['GET', 'POST'])
+@main.route('/donations/edit/<int:id>', methods=['GET', 'POST'])
 def edit_donation(id):
     try:
         donation = Donation.query.get_or_404(id)
         form = DonationForm(obj=donation)
-        form.donor_id.choices = [(d.donor_id, d.name) for d in Donor.query.all()]
         
         if form.validate_on_submit():
+            counted = rollup_donation(donation, -1)
+            if form.donor_id.data != donation.donor_id:
+                donation.blood_group = db.session.get(Donor, form.donor_id.data).blood_group
             donation.donor_id = form.donor_id.data
             donation.donation_date = form.donation_date.data
             donation.blood_volume_ml = form.blood_volume_ml.data
             donation.hospital = form.hospital.data
+            if counted:
+                rollup_donation(donation)
             
             db.session.commit()
             flash('Donation updated successfully!', 'success')
-            return redirect(url_for('view_donations'))
+            return redirect(url_for('main.view_donations'))
         
-        return render_template('edit_donation.html', form=form, donation=donation)
+        return render_template('edit_donation.html', form=form, donation=donation,
+                               donor_label=selected_label(Donor, form.donor_id.data))
     except Exception as e:
         flash(f'Error editing donation: {str(e)}', 'error')
-        return redirect(url_for('view_donations'))
+        return redirect(url_for('main.view_donations'))
 
-@app.route('/donations/delete/<int:id>')
+@main.route('/donations/delete/<int:id>', methods=['POST'])
 def delete_donation(id):
     try:
         donation = Donation.query.get_or_404(id)
-        db.session.delete(donation)
+        rollup_donation(donation, -1)
+        soft_delete(donation)
+        bump_stats(donations=-1)
         db.session.commit()
         flash('Donation deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting donation: {str(e)}', 'error')
     
-    return redirect(url_for('view_donations'))
+    return redirect(url_for('main.view_donations'))
 
-@app.route('/blood_inventory')
+@main.route('/blood_inventory')
 def blood_inventory():
     try:
-        inventory = BloodInventory.query.order_by(BloodInventory.blood_group).all()
+        inventory = get_inventory()
         return render_template('inventory.html', inventory=inventory)
     except Exception as e:
         flash(f'Error loading inventory: {str(e)}', 'error')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
-@app.route('/update_inventory', methods=['GET', 'POST'])
+@main.route('/update_inventory', methods=['GET', 'POST'])
 def update_inventory():
-    if request.method == 'POST':
+    form = InventoryUpdateForm()
+    if form.validate_on_submit():
         try:
-            blood_group = request.form.get('blood_group')
-            units = int(request.form.get('units', 0))
-            
-            if units < 0:
-                flash('Units cannot be negative', 'error')
-                return redirect(url_for('update_inventory'))
-            
-            inventory = BloodInventory.query.filter_by(blood_group=blood_group).first()
-            
-            if inventory:
-                inventory.total_units += units
-            else:
-                inventory = BloodInventory(blood_group=blood_group, total_units=units)
-                db.session.add(inventory)
-            
+            stock_units(unit_rows(form.blood_group.data, UNIT_VOLUME_ML, date.today()) * form.units.data, 'manual')
             db.session.commit()
             flash('Inventory updated successfully!', 'success')
-            return redirect(url_for('blood_inventory'))
+            return redirect(url_for('main.blood_inventory'))
         except Exception as e:
+            db.session.rollback()
             flash(f'Error updating inventory: {str(e)}', 'error')
+    for field, errors in form.errors.items():
+        flash(f'{form[field].label.text}: {errors[0]}', 'error')
     
-    return render_template('update_inventory.html')
+    return render_template('update_inventory.html', form=form, max_units=MAX_INVENTORY_UNITS)
+
+@main.route('/export/<entity>')
+def export_data(entity):
+    if entity not in EXPORTS:
+        abort(404)
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'json'):
+        abort(400)
+    compress = request.args.get('gzip', type=int) == 1
+
+    stmt = export_statement(entity, request.args.get('search', ''), request.args.get('status', ''))
+    columns = [column.name for column in stmt.selected_columns]
+
+    def generate():
+        result = db.session.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        writer = stream_csv if export_format == 'csv' else stream_json
+        chunks = writer(columns, result.partitions())
+        yield from gzip_stream(chunks) if compress else chunks
+
+    filename = f'{entity}.{export_format}' + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else ('text/csv' if export_format == 'csv' else 'application/json')
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@main.route('/api/requests/<int:request_id>/matches')
+def api_request_matches(request_id):
+    blood_request = BloodRequest.query.get_or_404(request_id)
+    donor_limit = min(request.args.get('donors', MATCH_DONOR_LIMIT, type=int), MAX_LOOKUP_LIMIT)
+    return jsonify(match_requests([blood_request], donor_limit)[0])
+
+@main.route('/api/requests/matches')
+def api_pending_matches():
+    limit = min(request.args.get('limit', MATCH_REQUEST_LIMIT, type=int), 1000)
+    donor_limit = min(request.args.get('donors', MATCH_DONOR_LIMIT, type=int), MAX_LOOKUP_LIMIT)
+    pending = BloodRequest.query.filter_by(status='Pending') \
+        .order_by(BloodRequest.created_at, BloodRequest.request_id).limit(limit).all()
+    return jsonify({'matches': match_requests(pending, donor_limit)})
+
+@main.route('/api/donors/eligible')
+def api_eligible_donors():
+    blood_group = request.args.get('blood_group', '').upper()
+    if blood_group not in BLOOD_GROUPS:
+        return jsonify({'error': f'blood_group must be one of {", ".join(BLOOD_GROUPS)}'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 100, type=int), 1), 1000)
+
+    refreshed_at, donor_ids = eligible_donor_cache.get(blood_group)
+    start = (page - 1) * per_page
+    donors = load_eligible_donors(list(donor_ids[start:start + per_page]))
+    return jsonify({
+        'blood_group': blood_group,
+        'total': len(donor_ids),
+        'page': page,
+        'per_page': per_page,
+        'pages': math.ceil(len(donor_ids) / per_page),
+        'refreshed_at': datetime.utcfromtimestamp(refreshed_at).isoformat(),
+        'donors': [{'donor_id': d.donor_id, 'name': d.name, 'phone': d.phone, 'email': d.email,
+                    'last_donation_date': d.last_donation_date.isoformat() if d.last_donation_date else None}
+                   for d in donors],
+    })
+
+@main.route('/api/donors/lookup')
+def lookup_donors():
+    term = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', LOOKUP_LIMIT, type=int), MAX_LOOKUP_LIMIT)
+    if not term:
+        return jsonify({'results': []})
+    return jsonify({'results': lookup_records(Donor, Donor.donor_id, term, limit)})
+
+@main.route('/api/recipients/lookup')
+def lookup_recipients():
+    term = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', LOOKUP_LIMIT, type=int), MAX_LOOKUP_LIMIT)
+    if not term:
+        return jsonify({'results': []})
+    return jsonify({'results': lookup_records(Recipient, Recipient.recipient_id, term, limit)})
+
+@main.route('/api/stats/stream')
+def api_stats_stream():
+    if not current_app.config['LIVE_STATS_STREAM']:
+        # The dashboard polls /api/stats instead
+        abort(404)
+    live_stats.start(current_app._get_current_object())
+    if not live_stats.has_snapshot:
+        stats = cached('stats', load_stats)
+        live_stats.publish(stats['payload'], stats['etag'])
+    # Release the request's connection now; the stream itself never queries
+    db.session.remove()
+    return Response(live_stats.stream(current_app.config['LIVE_STATS_HEARTBEAT']),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-@app.route('/api/stats')
+@main.route('/api/pool')
+def api_pool():
+    pool = db.engine.pool
+    with _pool_metrics_lock:
+        metrics = dict(pool_metrics)
+    metrics['pool_class'] = type(pool).__name__
+    # QueuePool (MySQL, file SQLite) reports its live state
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            metrics[f'pool_{name}'] = getattr(pool, name)()
+    return jsonify(metrics)
+
+@main.route('/reports')
+def reports():
+    try:
+        start, end, period = report_range(request.args)
+    except ValueError as e:
+        flash(f'Invalid report range: {str(e)}', 'error')
+        start, end, period = report_range({})
+    try:
+        report = rollup_report(start, end, period)
+        return render_template('reports.html', report=report)
+    except Exception as e:
+        flash(f'Error loading reports: {str(e)}', 'error')
+        return redirect(url_for('main.home'))
+
+@main.route('/api/reports')
+def api_reports():
+    try:
+        start, end, period = report_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        return jsonify(rollup_report(start, end, period))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/stats')
 def api_stats():
     try:
-        stats = {
-            'total_donors': Donor.query.count(),
-            'total_recipients': Recipient.query.count(),
-            'total_donations': Donation.query.count(),
-            'total_requests': BloodRequest.query.count(),
-            'blood_inventory': {inv.blood_group: inv.total_units for inv in BloodInventory.query.all()}
-        }
-        return jsonify(stats)
+        stats = cached('stats', load_stats)
+        # The dashboard poller revalidates with If-None-Match and gets a bodiless 304
+        if request.if_none_match.contains(stats['etag']):
+            response = Response(status=304)
+        else:
+            response = jsonify(stats['payload'])
+        response.set_etag(stats['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Error handlers
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return render_template('500.html'), 500
 
+# Application factory
+# create_app() is what `flask`, wsgi.py and the scripts call. Config comes
+# from the environment (and .env), overridable per app for tests and
+# scripts. Blueprints are named by import path and imported when an app
+# registers them. The CLI commands (cli.py) and the Alembic-backed
+# `flask db` commands are only loaded when CLI_COMMANDS is on, since web
+# workers never use them and Alembic is a large import.
+#
+# Under a preloading server the app is built once in the master and forked
+# into the workers. Pooled DB connections must not cross that fork (two
+# processes reading one socket get each other's results), locks may have
+# been held by another thread at fork time, and threads do not survive it,
+# so reinit_after_fork() rebuilds all of that in every child (jobs.py and
+# metrics.py reset their own). It is registered once, for the app created
+# last (the one a server preloads), and holds it weakly so apps a script
+# throws away are not kept alive.
+BLUEPRINTS = ('app:main', 'api:api_v1')
+CLI_BLUEPRINTS = ('cli:commands',)
+_fork_app = None
+
+def load_config(flask_app, config=None):
+    load_dotenv()
+    flask_app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    flask_app.config['STATS_RECONCILE_INTERVAL'] = int(os.getenv('STATS_RECONCILE_INTERVAL', 300))
+    flask_app.config['ELIGIBILITY_REFRESH_INTERVAL'] = int(os.getenv('ELIGIBILITY_REFRESH_INTERVAL', 300))
+    flask_app.config['EXPIRY_SWEEP_INTERVAL'] = int(os.getenv('EXPIRY_SWEEP_INTERVAL', 3600))
+    flask_app.config['CACHE_TTL'] = int(os.getenv('CACHE_TTL', 60))
+    flask_app.config['REDIS_URL'] = os.getenv('REDIS_URL')
+    flask_app.config['LIVE_STATS_POLL_INTERVAL'] = int(os.getenv('LIVE_STATS_POLL_INTERVAL', 5))
+    flask_app.config['LIVE_STATS_HEARTBEAT'] = int(os.getenv('LIVE_STATS_HEARTBEAT', 15))
+    # Each open stream holds a server thread; gunicorn.conf.py turns this off
+    # unless the workers are async (gevent, eventlet)
+    flask_app.config['LIVE_STATS_STREAM'] = os.getenv('LIVE_STATS_STREAM', '1') == '1'
+    flask_app.config['SLOW_QUERY_MS'] = int(os.getenv('SLOW_QUERY_MS', 200))
+    flask_app.config['JOBS_INLINE'] = os.getenv('JOBS_INLINE', '0') == '1'
+    flask_app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', 2))
+    flask_app.config['JOB_POLL_INTERVAL'] = int(os.getenv('JOB_POLL_INTERVAL', 2))
+    flask_app.config['JOB_LEASE_SECONDS'] = int(os.getenv('JOB_LEASE_SECONDS', 60))
+    flask_app.config['JOB_MAX_ATTEMPTS'] = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+    flask_app.config['JOB_RETENTION_DAYS'] = int(os.getenv('JOB_RETENTION_DAYS', 7))
+    flask_app.config['JOB_PURGE_INTERVAL'] = int(os.getenv('JOB_PURGE_INTERVAL', 3600))
+    flask_app.config['LOW_STOCK_UNITS'] = int(os.getenv('LOW_STOCK_UNITS', 5))
+    flask_app.config['LOW_STOCK_WEBHOOK_URL'] = os.getenv('LOW_STOCK_WEBHOOK_URL')
+    flask_app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+    flask_app.config['ARCHIVE_INTERVAL'] = int(os.getenv('ARCHIVE_INTERVAL', 86400))
+    flask_app.config['CLI_COMMANDS'] = True
+    flask_app.config.update(config or {})
+    flask_app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                                engine_options(flask_app.config['SQLALCHEMY_DATABASE_URI']))
+
+def create_app(config=None):
+    flask_app = Flask(__name__)
+    load_config(flask_app, config)
+
+    db.init_app(flask_app)
+    csrf.init_app(flask_app)
+    blueprints = BLUEPRINTS
+    if flask_app.config['CLI_COMMANDS']:
+        from flask_migrate import Migrate
+        Migrate(flask_app, db, render_as_batch=True,
+                include_name=lambda name, type_, parent_names: not is_search_index_object(name, type_))
+        blueprints += CLI_BLUEPRINTS
+    flask_app.extensions['cache'] = make_cache(flask_app.config['REDIS_URL'])
+    for blueprint in blueprints:
+        flask_app.register_blueprint(import_string(blueprint))
+
+    global _fork_app
+    _fork_app = weakref.ref(flask_app)
+    return flask_app
+
+def reinit_after_fork():
+    global _pool_metrics_lock, live_stats, eligible_donor_cache
+    flask_app = _fork_app() if _fork_app else None
+    if flask_app is not None:
+        with flask_app.app_context():
+            # Drop the parent's pool without closing its sockets, which the
+            # parent still owns; this process opens its own on first use
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+    _pool_metrics_lock = threading.Lock()
+    pool_metrics.update(dict.fromkeys(pool_metrics, 0), hold_seconds_total=0.0)
+    live_stats = StatsBroadcaster()
+    eligible_donor_cache = EligibleDonorCache()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reinit_after_fork)
+
 if __name__ == '__main__':
+    from flask_migrate import upgrade as upgrade_database
+
+    app = create_app()
     try:
         with app.app_context():
-            db.create_all()
+            upgrade_database()
+            reconcile_stats()
+            db.session.commit()
+        start_background_jobs(app)
         print("✅ Database tables created successfully!")
     except Exception as e:
         print(f"⚠️  Database connection failed: {e}")
@@ -0,0 +1,84 @@
+"""Concurrent writer load test.
+
+Runs several threads that each submit donor registrations through the
+real /donor/add route (one transaction per request) and reports
+throughput, failed writes and the pool metrics from /api/pool.
+
+    python benchmarks/concurrent_writers.py --threads 16 --requests 100
+
+Uses a throwaway SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+if 'DATABASE_URL' not in os.environ:
+    _tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'writers.db')}"
+
+from app import create_app, db  # noqa: E402
+
+app = create_app()
+
+
+def worker(thread_no, count, latencies, failures):
+    client = app.test_client()
+    for i in range(count):
+        started = time.perf_counter()
+        response = client.post('/donor/add', data={
+            'name': f'Load Donor {thread_no}-{i}', 'age': 30, 'gender': 'Male', 'blood_group': 'A+',
+            'phone': f'555{thread_no:03d}{i:04d}', 'email': f'load{thread_no}-{i}@example.com', 'address': 'Street',
+        })
+        latencies.append(time.perf_counter() - started)
+        # Success redirects to the list; errors re-render the form
+        if response.status_code != 302:
+            failures.append(response.status_code)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=100, help='requests per thread')
+    args = parser.parse_args()
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        backend = db.engine.dialect.name
+        journal_mode = None
+        if backend == 'sqlite':
+            journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+
+    latencies, failures = [], []
+    threads = [threading.Thread(target=worker, args=(n, args.requests, latencies, failures))
+               for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = args.threads * args.requests
+    print(backend + (f' (journal_mode={journal_mode})' if journal_mode else ''))
+    print(f'{total} writes from {args.threads} threads in {elapsed:.2f}s: {total / elapsed:.0f} writes/s')
+    print(f'latency p50 {percentile(latencies, 50) * 1000:.1f}ms, '
+          f'p99 {percentile(latencies, 99) * 1000:.1f}ms')
+    print(f'failed writes: {len(failures)}')
+    print(f'pool: {app.test_client().get("/api/pool").get_json()}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""POST latency with follow-up work inline vs. queued.
+
+Posts donations through the Flask test client from several threads
+against two copies of a seeded database: once with JOBS_INLINE (stocking
+the blood units and updating the rollup inside the request, as before the
+job queue) and once with that work queued. Reports the latency
+percentiles of both runs and, for the queued run, how long the jobs took
+to drain after the last request.
+
+    python benchmarks/seed.py --db /tmp/bench.db
+    python benchmarks/post_latency.py --db /tmp/bench.db
+    python benchmarks/post_latency.py --db /tmp/bench.db --runner process
+
+By default the queued run uses the in-process worker threads, as a web
+process does; --runner process runs the jobs in a separate `flask
+run-jobs` process instead. With SQLite every write waits for the one
+write lock, so the tail latency gains show up with concurrent writers.
+
+Both runs start from an untouched copy of --db, so the file is not
+modified. Exits non-zero if a request failed or a job did not finish.
+"""
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def post_donations(app, donors, threads, requests_per_thread):
+    latencies, failures = [], []
+
+    def worker(thread_no):
+        rng = random.Random(thread_no)
+        client = app.test_client()
+        for _ in range(requests_per_thread):
+            started = time.perf_counter()
+            response = client.post('/donations/add', data={
+                'donor_id': rng.randint(1, donors), 'donation_date': date.today().isoformat(),
+                'blood_volume_ml': 450, 'hospital': 'Bench Hospital'})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                failures.append(response.status_code)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        'requests': len(ms),
+        'p50_ms': round(percentile(ms, 50), 2),
+        'p95_ms': round(percentile(ms, 95), 2),
+        'p99_ms': round(percentile(ms, 99), 2),
+        'posts_per_second': round(len(ms) / elapsed, 1),
+        'failures': len(failures),
+    }
+
+
+def wait_for_queue(app_module, jobs_module, app, timeout):
+    db, Job = app_module.db, jobs_module.Job
+    started = time.perf_counter()
+    with app.app_context():
+        while time.perf_counter() - started < timeout:
+            left = db.session.scalar(db.select(db.func.count()).select_from(Job)
+                                     .where(Job.status.in_(['pending', 'running'])))
+            db.session.commit()
+            if not left:
+                break
+            time.sleep(0.01)
+        failed = db.session.scalar(db.select(db.func.count()).select_from(Job).where(Job.status == 'failed'))
+    return round((time.perf_counter() - started) * 1000, 1), left, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite file created by benchmarks/seed.py')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help='donations posted per thread')
+    parser.add_argument('--workers', type=int, default=2, help='job worker threads in the queued run')
+    parser.add_argument('--runner', choices=['thread', 'process'], default='thread',
+                        help='run queued jobs in this process or in a separate flask run-jobs process')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds to wait for the queue to drain')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f'{args.db} does not exist; create it with benchmarks/seed.py')
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    import jobs as jobs_module
+
+    tmpdir = tempfile.mkdtemp()
+    results = {}
+    for mode in ('inline', 'queued'):
+        path = os.path.join(tmpdir, f'{mode}.db')
+        shutil.copy(args.db, path)
+        in_process = mode == 'queued' and args.runner == 'thread'
+        app = app_module.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+                                     'WTF_CSRF_ENABLED': False, 'JOBS_INLINE': mode == 'inline',
+                                     'JOB_WORKERS': args.workers if in_process else 0})
+        with app.app_context():
+            # Seeded files from before the job queue have no jobs table
+            app_module.db.create_all()
+            donors = app_module.get_dashboard_stats().total_donors
+        runner = None
+        if in_process:
+            jobs_module.job_workers.start(app, args.workers)
+        elif mode == 'queued':
+            # Without a shared wake-up, the runner picks jobs up by polling
+            runner = subprocess.Popen(
+                [sys.executable, '-m', 'flask', '--app', 'app', 'run-jobs', '--workers', str(args.workers)],
+                cwd=ROOT, env=dict(os.environ, DATABASE_URL=f'sqlite:///{path}', JOB_POLL_INTERVAL='1'),
+                stdout=subprocess.DEVNULL)
+
+        try:
+            result = post_donations(app, donors, args.threads, args.requests)
+            if mode == 'queued':
+                result['drain_ms'], result['jobs_left'], result['jobs_failed'] = wait_for_queue(
+                    app_module, jobs_module, app, args.timeout)
+        finally:
+            if runner:
+                runner.terminate()
+                runner.wait()
+        results[mode] = result
+        print(f"  {mode:<7} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+              f"p99 {result['p99_ms']:>8.2f}ms  {result['posts_per_second']} posts/s  "
+              f"{result['failures']} failures")
+
+    queued = results['queued']
+    print(f"  queue drained {queued['drain_ms']:.0f}ms after the last request "
+          f"({queued['jobs_left']} left, {queued['jobs_failed']} failed)")
+    change = (queued['p99_ms'] - results['inline']['p99_ms']) / results['inline']['p99_ms']
+    print(f"  p99 {results['inline']['p99_ms']:.2f} -> {queued['p99_ms']:.2f} ms ({change:+.0%})")
+
+    failures = sum(result['failures'] for result in results.values())
+    if failures or queued['jobs_left'] or queued['jobs_failed']:
+        print(f"❌ {failures} failed request(s), {queued['jobs_left']} unfinished and "
+              f"{queued['jobs_failed']} failed job(s)")
+        sys.exit(1)
+    print('✅ All requests and jobs succeeded')
+
+
+if __name__ == '__main__':
+    main()
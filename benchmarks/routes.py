@@ -0,0 +1,242 @@
+"""Route benchmarks against a seeded database.
+
+Times the hot routes through the Flask test client (dashboard, donor
+search, a deep donations page with OFFSET and with a keyset cursor, the
+add-donation form, /api/stats) and then a concurrent mix of writes. Each
+scenario reports latency percentiles and the SQL statements per request.
+
+    python benchmarks/seed.py --db /tmp/bench.db
+    python benchmarks/routes.py --db /tmp/bench.db
+
+Results are saved as benchmarks/results/<timestamp>-<commit>.json. The run
+is compared with the newest earlier result (or --compare FILE) and exits
+non-zero when a scenario's p50 grew by more than --threshold. The write
+scenarios add rows, so compare runs against freshly seeded copies.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+SEARCH_TERMS = ['Sharma', 'Garcia', 'Chen', 'Patel', 'Novak', 'Silva']
+# op -> weight in the concurrent write mix
+WRITE_MIX = {'add_donor': 3, 'add_donation': 4, 'add_request': 2, 'update_inventory': 1}
+# Ignore p50 changes smaller than this; they are timer noise
+NOISE_FLOOR_MS = 1.0
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def summarize(latencies, queries, failures):
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        'iterations': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 3),
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'queries': percentile(queries, 50) if queries else None,
+        'failures': failures,
+    }
+
+
+def donor_form(rng, n):
+    return {'name': f'Bench Donor {n}', 'age': rng.randint(18, 65), 'gender': 'Female',
+            'blood_group': rng.choice(['A+', 'O+', 'B-']), 'phone': f'777{n:07d}',
+            'email': f'bench{n}@example.com', 'address': 'Bench Street'}
+
+
+def build_scenarios(app_module, app, totals):
+    db = app_module.db
+    rng = random.Random(0)
+    deep_page = max(1, totals['donations'] // app_module.PER_PAGE // 2)
+    with app.app_context():
+        middle = db.session.execute(
+            db.select(app_module.Donation.created_at, app_module.Donation.donation_id)
+            .order_by(app_module.Donation.created_at.desc(), app_module.Donation.donation_id.desc())
+            .offset(totals['donations'] // 2).limit(1)
+        ).first()
+    cursor = app_module.encode_cursor(*middle) if middle else ''
+
+    def add_donation(client):
+        return client.post('/donations/add', data={
+            'donor_id': rng.randint(1, totals['donors']), 'donation_date': date.today().isoformat(),
+            'blood_volume_ml': 450, 'hospital': 'Bench Hospital'})
+
+    # name -> (request function, expected status)
+    return {
+        'home': (lambda client: client.get('/'), 200),
+        'donor_search': (lambda client: client.get(f'/donor/view?search={rng.choice(SEARCH_TERMS)}'), 200),
+        'donations_deep_offset': (lambda client: client.get(f'/donations/view?page={deep_page}'), 200),
+        'donations_deep_keyset': (lambda client: client.get(f'/donations/view?after={cursor}'), 200),
+        'api_stats': (lambda client: client.get('/api/stats'), 200),
+        'add_donation_form': (lambda client: client.get('/donations/add'), 200),
+        'add_donation': (add_donation, 302),
+    }
+
+
+def run_scenario(app, request_fn, expected, iterations, warmup, statements):
+    client = app.test_client()
+    for _ in range(warmup):
+        request_fn(client)
+    latencies, queries, failures = [], [], 0
+    for _ in range(iterations):
+        statements.clear()
+        started = time.perf_counter()
+        response = request_fn(client)
+        latencies.append(time.perf_counter() - started)
+        queries.append(len(statements))
+        failures += response.status_code != expected
+    return summarize(latencies, queries, failures)
+
+
+def run_write_mix(app, totals, threads, requests_per_thread):
+    latencies, failures = [], []
+    ops = list(WRITE_MIX)
+    weights = list(WRITE_MIX.values())
+
+    def worker(thread_no):
+        rng = random.Random(thread_no)
+        client = app.test_client()
+        for i in range(requests_per_thread):
+            op = rng.choices(ops, weights)[0]
+            if op == 'add_donor':
+                url, data = '/donor/add', donor_form(rng, thread_no * 1000000 + i)
+            elif op == 'add_donation':
+                url, data = '/donations/add', {
+                    'donor_id': rng.randint(1, totals['donors']), 'donation_date': date.today().isoformat(),
+                    'blood_volume_ml': 450, 'hospital': 'Bench Hospital'}
+            elif op == 'add_request':
+                url, data = '/requests/add', {
+                    'recipient_id': rng.randint(1, totals['recipients']), 'blood_group': 'O+',
+                    'quantity_needed_ml': 450}
+            else:
+                url, data = '/update_inventory', {'blood_group': 'O+', 'units': 1}
+            started = time.perf_counter()
+            response = client.post(url, data=data)
+            latencies.append(time.perf_counter() - started)
+            # Success redirects; errors re-render the form
+            if response.status_code != 302:
+                failures.append(op)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies, [], len(failures))
+    result['threads'] = threads
+    result['writes_per_second'] = round(len(latencies) / elapsed, 1)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {os.path.basename(baseline_path)} (commit {baseline.get('commit')}):")
+    regressions = []
+    for name, result in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        old, new = before['p50_ms'], result['p50_ms']
+        change = (new - old) / old if old else 0.0
+        regressed = change > threshold and new - old > NOISE_FLOOR_MS
+        regressions += [name] if regressed else []
+        print(f"  {'REGRESSED' if regressed else 'ok':<10}{name:<24}{old:>9.2f} -> {new:>9.2f} ms p50 "
+              f"({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite file created by benchmarks/seed.py')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=8, help='threads in the concurrent write mix')
+    parser.add_argument('--writes', type=int, default=50, help='writes per thread in the mix')
+    parser.add_argument('--compare', help='result file to compare with (default: newest earlier result)')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p50 growth, e.g. 0.2 = 20%%')
+    parser.add_argument('--no-save', action='store_true', help='do not write a result file')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f'{args.db} does not exist; create it with benchmarks/seed.py')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.db)}'
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import event
+    import app as app_module
+
+    app = app_module.create_app({'WTF_CSRF_ENABLED': False})
+    db = app_module.db
+    with app.app_context():
+        stats = app_module.get_dashboard_stats()
+        totals = {'donors': stats.total_donors, 'recipients': stats.total_recipients,
+                  'donations': stats.total_donations, 'requests': stats.total_requests}
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    print(f"Dataset: {', '.join(f'{count:,} {name}' for name, count in totals.items())}")
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'dataset': totals,
+        'scenarios': {},
+    }
+    for name, (request_fn, expected) in build_scenarios(app_module, app, totals).items():
+        result = run_scenario(app, request_fn, expected, args.iterations, args.warmup, statements)
+        results['scenarios'][name] = result
+        print(f"  {name:<24} p50 {result['p50_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+              f"{result['queries']:>3} queries  {result['failures']} failures")
+
+    mix = run_write_mix(app, totals, args.threads, args.writes)
+    results['scenarios']['concurrent_write_mix'] = mix
+    print(f"  {'concurrent_write_mix':<24} p50 {mix['p50_ms']:>8.2f}ms  p99 {mix['p99_ms']:>8.2f}ms  "
+          f"{mix['writes_per_second']} writes/s  {mix['failures']} failures")
+
+    earlier = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    baseline = args.compare or (earlier[-1] if earlier else None)
+    regressions = compare(results, baseline, args.threshold) if baseline else []
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{results['timestamp'].replace(':', '')}-{results['commit']}.json")
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'\nSaved {os.path.relpath(path, ROOT)}')
+
+    failures = sum(result['failures'] for result in results['scenarios'].values())
+    if regressions or failures:
+        print(f'❌ {len(regressions)} regression(s), {failures} failed request(s)')
+        sys.exit(1)
+    print('✅ No regressions')
+
+
+if __name__ == '__main__':
+    main()
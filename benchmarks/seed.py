@@ -0,0 +1,171 @@
+"""Seed a SQLite database with a large synthetic dataset.
+
+Generates donors, recipients, donations and blood requests spread over the
+last few years, then derives everything the app keeps alongside the raw
+rows (last donation dates, blood units still in date, inventory totals,
+dashboard counters and the analytics rollups). Generation is seeded, so the
+same arguments always produce the same database.
+
+    python benchmarks/seed.py --db /tmp/bench.db --donations 1000000
+
+Rows are inserted with one executemany per batch; a million donations take
+a few minutes on a laptop.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Priya', 'Arjun', 'Ananya', 'Rahul', 'Wei', 'Mei', 'Carlos', 'Sofia', 'Ahmed', 'Fatima']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Sharma', 'Patel', 'Reddy', 'Iyer', 'Chen', 'Wang', 'Khan', 'Silva', 'Novak']
+HOSPITALS = ['City General', 'St. Mary', 'Memorial', 'Riverside', 'Northside Clinic', 'University Hospital',
+             'Lakeside Medical', 'Red Cross Center']
+# Rough population frequencies
+BLOOD_GROUP_WEIGHTS = {'O+': 38, 'A+': 34, 'B+': 9, 'AB+': 3, 'O-': 7, 'A-': 6, 'B-': 2, 'AB-': 1}
+RECIPIENT_STATUS_WEIGHTS = {'Pending': 20, 'Approved': 30, 'Completed': 40, 'Cancelled': 10}
+BATCH_SIZE = 10000
+
+
+def spread(history_start, history_days, i, count):
+    # i-th of count timestamps evenly spaced over the history, oldest first
+    return datetime.combine(history_start, datetime.min.time()) + timedelta(
+        seconds=int(history_days * 86400 * i / max(1, count)))
+
+
+def person(rng, prefix, i, created_at):
+    return {
+        'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+        'age': rng.randint(18, 65),
+        'gender': rng.choice(['Male', 'Female', 'Other']),
+        'blood_group': rng.choices(list(BLOOD_GROUP_WEIGHTS), list(BLOOD_GROUP_WEIGHTS.values()))[0],
+        'phone': f'555{i:07d}',
+        'email': f'{prefix}{i}@example.com',
+        'address': f'{rng.randint(1, 999)} Main Street',
+        'created_at': created_at,
+    }
+
+
+def insert_batches(db, table, count, make_row, label):
+    started = time.perf_counter()
+    for start in range(0, count, BATCH_SIZE):
+        rows = [make_row(i) for i in range(start, min(count, start + BATCH_SIZE))]
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+    print(f'  {count:>9,} {label} in {time.perf_counter() - started:.1f}s')
+
+
+def seed(app_module, donors, recipients, donations, requests, years=3, seed_value=0):
+    db = app_module.db
+    rng = random.Random(seed_value)
+    today = date.today()
+    history_days = 365 * years
+    history_start = today - timedelta(days=history_days)
+
+    def keyed(row):
+        return dict(row, **app_module.contact_keys(row))
+
+    insert_batches(db, app_module.Donor.__table__, donors,
+                   lambda i: keyed(person(rng, 'donor', i, spread(history_start, history_days, i, donors))),
+                   'donors')
+    insert_batches(db, app_module.Recipient.__table__, recipients,
+                   lambda i: dict(keyed(person(rng, 'recipient', i,
+                                               spread(history_start, history_days, i, recipients))),
+                                  request_status=rng.choices(list(RECIPIENT_STATUS_WEIGHTS),
+                                                             list(RECIPIENT_STATUS_WEIGHTS.values()))[0]),
+                   'recipients')
+
+    Donor = app_module.Donor
+    donor_groups = dict(db.session.execute(db.select(Donor.donor_id, Donor.blood_group)).all())
+
+    def donation(i):
+        donation_date = history_start + timedelta(days=history_days * i // max(1, donations))
+        donor_id = rng.randint(1, donors)
+        return {
+            'donor_id': donor_id,
+            'blood_group': donor_groups[donor_id],
+            'donation_date': donation_date,
+            'blood_volume_ml': rng.choice([350, 400, 450, 450, 450, 500]),
+            'hospital': rng.choice(HOSPITALS),
+            'created_at': datetime.combine(donation_date, datetime.min.time()) + timedelta(seconds=i % 86400),
+        }
+    insert_batches(db, app_module.Donation.__table__, donations, donation, 'donations')
+
+    def blood_request(i):
+        created_at = spread(history_start, history_days, i, requests)
+        # Only recent requests are still waiting
+        status = 'Pending' if (today - created_at.date()).days < 14 else \
+            rng.choices(['Approved', 'Completed', 'Cancelled'], [30, 60, 10])[0]
+        return {
+            'recipient_id': rng.randint(1, recipients),
+            'blood_group': rng.choices(list(BLOOD_GROUP_WEIGHTS), list(BLOOD_GROUP_WEIGHTS.values()))[0],
+            'quantity_needed_ml': rng.choice([450, 900, 1350]),
+            'status': status,
+            'created_at': created_at,
+        }
+    insert_batches(db, app_module.BloodRequest.__table__, requests, blood_request, 'requests')
+
+    started = time.perf_counter()
+    Donor, Donation = app_module.Donor, app_module.Donation
+    latest = db.session.execute(
+        db.select(Donation.donor_id, db.func.max(Donation.donation_date)).group_by(Donation.donor_id)
+    ).all()
+    db.session.execute(
+        db.update(Donor.__table__)
+        .where(Donor.donor_id == db.bindparam('b_donor_id'))
+        .values(last_donation_date=db.bindparam('b_date')),
+        [{'b_donor_id': donor_id, 'b_date': donation_date} for donor_id, donation_date in latest]
+    )
+    # Units only for donations still within their shelf life
+    shelf_start = today - timedelta(days=app_module.UNIT_SHELF_LIFE_DAYS)
+    recent = db.session.execute(
+        db.select(Donation.donation_id, Donor.blood_group, Donation.blood_volume_ml, Donation.donation_date)
+        .join(Donor, Donor.donor_id == Donation.donor_id)
+        .where(Donation.donation_date >= shelf_start)
+    ).all()
+    units = [row for donation_id, blood_group, volume_ml, donation_date in recent
+             for row in app_module.unit_rows(blood_group, volume_ml, donation_date, donation_id=donation_id)]
+    for start in range(0, len(units), BATCH_SIZE):
+        db.session.execute(app_module.BloodUnit.__table__.insert(), units[start:start + BATCH_SIZE])
+    app_module.reconcile_inventory()
+    app_module.reconcile_stats()
+    app_module.rebuild_rollups()
+    db.session.commit()
+    print(f'  derived data ({len(units):,} units in date) in {time.perf_counter() - started:.1f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite file to create (must not exist)')
+    parser.add_argument('--donors', type=int, default=100000)
+    parser.add_argument('--recipients', type=int, default=50000)
+    parser.add_argument('--donations', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--years', type=int, default=3, help='history length')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f'{args.db} already exists')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.db)}'
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    # Bulk inserts are slow by design; keep them out of the slow query log
+    app = app_module.create_app({'SLOW_QUERY_MS': 60000})
+
+    print(f'Seeding {args.db}')
+    with app.app_context():
+        app_module.db.create_all()
+        seed(app_module, args.donors, args.recipients, args.donations, args.requests,
+             years=args.years, seed_value=args.seed)
+    print('✅ Done')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Idle Server-Sent Events connection benchmark.
+
+Starts the app in a child process (gevent's WSGI server when gevent is
+installed, otherwise Werkzeug's threaded server), opens many idle
+/api/stats/stream connections, then records one inventory change and
+measures how long the change takes to reach every client. It also reports
+the server's resident memory with all streams open.
+
+    python benchmarks/sse_idle_connections.py --clients 1000
+
+Linux only (memory is read from /proc).
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve(port):
+    raise_fd_limit()
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+        from gevent.pywsgi import WSGIServer
+    except ImportError:
+        WSGIServer = None
+
+    sys.path.insert(0, ROOT)
+    from app import create_app, db
+    app = create_app({'WTF_CSRF_ENABLED': False, 'LIVE_STATS_POLL_INTERVAL': 1})
+    with app.app_context():
+        db.create_all()
+
+    if WSGIServer is not None:
+        print('server: gevent', flush=True)
+        WSGIServer(('127.0.0.1', port), app, log=None).serve_forever()
+    else:
+        from werkzeug.serving import make_server
+        print('server: werkzeug threaded', flush=True)
+        make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def open_stream(port, connected, changed):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET /api/stats/stream HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n'.encode())
+    await writer.drain()
+    saw_snapshot = False
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        if line.startswith(b'event: stats') and not saw_snapshot:
+            saw_snapshot = True
+            connected.append(time.perf_counter())
+        elif line.startswith(b'event: delta'):
+            changed.append(time.perf_counter())
+            writer.close()
+            return
+
+
+async def run(port, clients, timeout):
+    connected, changed = [], []
+    tasks = [asyncio.create_task(open_stream(port, connected, changed)) for _ in range(clients)]
+
+    started = time.perf_counter()
+    while len(connected) < clients and time.perf_counter() - started < timeout:
+        await asyncio.sleep(0.1)
+    connect_time = time.perf_counter() - started
+    return tasks, connected, changed, connect_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--port', type=int, default=5123)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    raise_fd_limit()
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'sse.db')}")
+    server = subprocess.Popen([sys.executable, __file__, '--serve', '--port', str(args.port)], env=env)
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f'{base_url}/api/stats', timeout=1)
+                break
+            except OSError:
+                time.sleep(0.2)
+        baseline = rss_mb(server.pid)
+
+        loop = asyncio.new_event_loop()
+        tasks, connected, changed, connect_time = loop.run_until_complete(
+            run(args.port, args.clients, args.timeout))
+        idle_rss = rss_mb(server.pid)
+        print(f'{len(connected)}/{args.clients} streams connected in {connect_time:.1f}s; '
+              f'server RSS {baseline:.0f}MB -> {idle_rss:.0f}MB '
+              f'({(idle_rss - baseline) * 1024 / max(len(connected), 1):.0f}KB per stream)')
+
+        published = time.perf_counter()
+        data = urllib.parse.urlencode({'blood_group': 'O-', 'units': 1}).encode()
+        urllib.request.urlopen(f'{base_url}/update_inventory', data=data, timeout=10)
+
+        async def wait_for_fanout():
+            await asyncio.wait_for(asyncio.gather(*tasks), args.timeout)
+        try:
+            loop.run_until_complete(wait_for_fanout())
+        except asyncio.TimeoutError:
+            pass
+        if changed:
+            print(f'{len(changed)}/{len(connected)} streams received the update; '
+                  f'last one {(max(changed) - published) * 1000:.0f}ms after the write')
+        ok = len(connected) == args.clients and len(changed) == args.clients
+        print('✅ All streams held and updated' if ok else '❌ Some streams failed')
+        sys.exit(0 if ok else 1)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Startup time and per-worker memory benchmark.
+
+Cold start: runs a fresh interpreter several times, each importing wsgi.py
+(create_app() plus the preload warm-up) and serving one dashboard request
+through the test client, and reports the median import, first-request and
+total process times.
+
+Per-worker memory: boots gunicorn with gunicorn.conf.py, with and without
+preload_app, waits for the first response (the server's time to ready),
+sends some traffic and reads every worker's memory from /proc. USS (pages
+only that worker holds) is what each extra worker really costs; PSS
+splits shared pages evenly between the processes sharing them.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --max-cold-start-ms 2500 --max-worker-uss-mb 40
+
+Exits non-zero when a --max-* budget is exceeded, so CI can track it.
+Linux only (memory is read from /proc).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = """
+import json, time
+started = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+response = wsgi.app.test_client().get('/')
+assert response.status_code == 200, response.status_code
+print(json.dumps({'import_ms': (imported - started) * 1000,
+                  'first_request_ms': (time.perf_counter() - imported) * 1000}))
+"""
+
+
+def create_database(env):
+    code = ('from app import create_app, db\n'
+            'app = create_app()\n'
+            'with app.app_context():\n'
+            '    db.create_all()\n')
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True)
+
+
+def cold_start(env, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', COLD_START], cwd=ROOT, env=env, check=True,
+                                capture_output=True, text=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_ms'] = (time.perf_counter() - started) * 1000
+        samples.append(sample)
+    return {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Field 4 is the parent pid; the name in field 2 may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def memory_mb(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss_mb': round(fields.get('Rss', 0), 1),
+        'pss_mb': round(fields.get('Pss', 0), 1),
+        'uss_mb': round(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0), 1),
+    }
+
+
+def worker_memory(env, workers, preload, requests, timeout):
+    port = free_port()
+    env = dict(env, GUNICORN_PRELOAD='1' if preload else '0', WEB_CONCURRENCY=str(workers),
+               BIND=f'127.0.0.1:{port}')
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}/'
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(url, timeout=5).read()
+                break
+            except OSError:
+                if server.poll() is not None or time.perf_counter() - started > timeout:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.02)
+        ready_ms = (time.perf_counter() - started) * 1000
+
+        while len(child_pids(server.pid)) < workers and time.perf_counter() - started < timeout:
+            time.sleep(0.05)
+        for _ in range(requests):
+            for path in ('/', '/donor/view', '/blood_inventory', '/api/stats'):
+                urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5).read()
+
+        per_worker = [memory_mb(pid) for pid in child_pids(server.pid)]
+        return {
+            'preload': preload,
+            'workers': len(per_worker),
+            'ready_ms': round(ready_ms, 1),
+            'master': memory_mb(server.pid),
+            'worker_avg': {key: round(statistics.mean(w[key] for w in per_worker), 1) for key in per_worker[0]},
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='cold starts to take the median of')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=50, help='request rounds before reading memory')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--max-cold-start-ms', type=float, help='budget for the median cold start process')
+    parser.add_argument('--max-worker-uss-mb', type=float, help='budget for the preloaded workers\' USS')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}")
+    create_database(env)
+
+    results = {'cold_start': cold_start(env, args.runs), 'gunicorn': []}
+    cold = results['cold_start']
+    print(f"Cold start (median of {args.runs}): import {cold['import_ms']:.0f}ms, "
+          f"first request {cold['first_request_ms']:.0f}ms, process {cold['process_ms']:.0f}ms")
+
+    for preload in (True, False):
+        result = worker_memory(env, args.workers, preload, args.requests, args.timeout)
+        results['gunicorn'].append(result)
+        worker = result['worker_avg']
+        print(f"gunicorn {'preload' if preload else 'no preload':<11} ready {result['ready_ms']:>6.0f}ms  "
+              f"master RSS {result['master']['rss_mb']:>5.1f}MB  per worker ({result['workers']}): "
+              f"RSS {worker['rss_mb']:>5.1f}MB  PSS {worker['pss_mb']:>5.1f}MB  USS {worker['uss_mb']:>5.1f}MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    problems = []
+    if args.max_cold_start_ms and cold['process_ms'] > args.max_cold_start_ms:
+        problems.append(f"cold start {cold['process_ms']:.0f}ms > {args.max_cold_start_ms:.0f}ms")
+    preloaded = results['gunicorn'][0]['worker_avg']
+    if args.max_worker_uss_mb and preloaded['uss_mb'] > args.max_worker_uss_mb:
+        problems.append(f"worker USS {preloaded['uss_mb']:.1f}MB > {args.max_worker_uss_mb:.1f}MB")
+    if problems:
+        print(f"❌ Over budget: {'; '.join(problems)}")
+        sys.exit(1)
+    print('✅ Startup within budget')
+
+
+if __name__ == '__main__':
+    main()
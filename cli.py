@@ -0,0 +1,145 @@
+"""The `flask` commands (`flask --app app <command>`).
+
+Maintenance, import and job runner commands. create_app() registers them
+only with CLI_COMMANDS on, so the web workers (wsgi.py) never import them.
+"""
+from flask import Blueprint, current_app
+from datetime import datetime
+import click
+import time
+
+from app import (BloodInventory, DonationRollup, RequestRollup, ARCHIVE_BATCH_SIZE, DEDUPE_ENTITIES, IMPORTERS,
+                 IMPORT_BATCH_SIZE, archive_records, auto_allocate_pending, duplicate_clusters, import_records,
+                 merge_records, primary_key, read_import_rows, rebuild_rollups, rebuild_search_index,
+                 reconcile_inventory, reconcile_stats, same_person, sweep_expired_units)
+from extensions import db
+from jobs import Job, job_workers, run_due_jobs
+
+commands = Blueprint('commands', __name__, cli_group=None)
+
+@commands.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Recompute the dashboard counters from the entity tables."""
+    stats = reconcile_stats()
+    db.session.commit()
+    print(f"✅ Stats reconciled: {stats.total_donors} donors, {stats.total_recipients} recipients, "
+          f"{stats.total_donations} donations, {stats.total_requests} requests")
+
+@commands.cli.command('expire-units')
+def expire_units_command():
+    """Retire every blood unit past its expiry date."""
+    print(f"✅ Retired {sweep_expired_units()} expired unit(s)")
+
+@commands.cli.command('reconcile-inventory')
+@click.option('--adopt-untracked', is_flag=True,
+              help='Create unit records for stock counted before unit tracking instead of dropping it.')
+def reconcile_inventory_command(adopt_untracked):
+    """Recompute inventory totals from the available blood units."""
+    reconcile_inventory(adopt_untracked)
+    db.session.commit()
+    print("✅ Inventory reconciled: " + ", ".join(
+        f"{inv.blood_group}={inv.total_units}" for inv in BloodInventory.query.order_by(BloodInventory.blood_group)))
+
+@commands.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the daily analytics rollups from the raw tables."""
+    rebuild_rollups()
+    db.session.commit()
+    print(f"✅ Rollups rebuilt: {DonationRollup.query.count()} donation rows, "
+          f"{RequestRollup.query.count()} request rows")
+
+@commands.cli.command('run-jobs')
+@click.option('--workers', default=2, show_default=True, help='Worker threads.')
+@click.option('--once', is_flag=True, help='Run the jobs that are due now and exit.')
+def run_jobs_command(workers, once):
+    """Run queued jobs, in the foreground."""
+    if once:
+        print(f'✅ Ran {run_due_jobs()} job(s)')
+        return
+    job_workers.start(current_app._get_current_object(), workers)
+    print(f'Running jobs with {workers} worker(s); Ctrl+C to stop')
+    job_workers.join()
+
+@commands.cli.command('retry-jobs')
+def retry_jobs_command():
+    """Queue every failed job again."""
+    retried = db.session.execute(
+        db.update(Job).where(Job.status == 'failed')
+        .values(status='pending', attempts=0, run_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    print(f'✅ {retried} failed job(s) queued again')
+
+@commands.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Create the search index if missing and reindex all rows."""
+    if not rebuild_search_index():
+        print(f"⚠️  No search index support for {db.engine.dialect.name}; searches use ilike")
+        return
+    print("✅ Search index rebuilt")
+
+@commands.cli.command('find-duplicates')
+@click.argument('entity', type=click.Choice(list(DEDUPE_ENTITIES)))
+@click.option('--merge', is_flag=True, help='Merge clusters whose records also share a name into the oldest one.')
+def find_duplicates_command(entity, merge):
+    """List donors or recipients that share a phone number or email."""
+    model = DEDUPE_ENTITIES[entity]
+    pk = primary_key(model)
+    clusters = duplicate_clusters(model)
+    merged = 0
+    for ids in clusters:
+        records = model.query.filter(pk.in_(ids)).order_by(pk).all()
+        print(' | '.join(f'#{getattr(r, pk.key)} {r.name} {r.phone} {r.email}' for r in records))
+        if merge and same_person(records):
+            try:
+                merged += merge_records(entity, ids[0], ids[1:])
+                db.session.commit()
+                print(f'   merged into #{ids[0]}')
+            except ValueError as e:
+                db.session.rollback()
+                print(f'   not merged: {e}')
+    print(f"✅ {len(clusters)} duplicate cluster(s) among {entity}" + (f', {merged} record(s) merged' if merge else ''))
+
+@commands.cli.command('merge-records')
+@click.argument('entity', type=click.Choice(list(DEDUPE_ENTITIES)))
+@click.argument('keep_id', type=int)
+@click.argument('duplicate_ids', type=int, nargs=-1, required=True)
+def merge_records_command(entity, keep_id, duplicate_ids):
+    """Merge duplicate donors or recipients into KEEP_ID."""
+    try:
+        merged = merge_records(entity, keep_id, duplicate_ids)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    print(f'✅ Merged {merged} {entity} into #{keep_id}')
+
+@commands.cli.command('archive-records')
+@click.option('--days', type=int, help='Archive rows older than this (default: ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True, help='Rows per transaction.')
+def archive_records_command(days, batch_size):
+    """Move old donations and closed requests into the archive tables."""
+    moved = archive_records(days, batch_size)
+    print(f"✅ Archived {moved['donations']} donation(s) and {moved['requests']} request(s)")
+
+@commands.cli.command('import-data')
+@click.argument('entity', type=click.Choice(list(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Rows per transaction.')
+def import_data_command(entity, path, batch_size):
+    """Import donors, recipients or donations from a CSV or JSONL file."""
+    started = time.perf_counter()
+    with current_app.test_request_context():
+        report = import_records(entity, read_import_rows(path), batch_size)
+
+    for line_no, message in report.errors:
+        print(f'line {line_no}: {message}')
+    print(f"✅ Imported {report.imported} {entity} in {time.perf_counter() - started:.1f}s, "
+          f"{len(report.errors)} row(s) rejected")
+
+@commands.cli.command('auto-allocate')
+def auto_allocate_command():
+    """Approve pending requests that compatible stock can fully cover."""
+    approved, unfilled = auto_allocate_pending()
+    db.session.commit()
+    print(f"✅ Allocated stock to {len(approved)} request(s); {unfilled} still pending")
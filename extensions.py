@@ -0,0 +1,10 @@
+"""Flask extensions, created unbound; create_app() initialises them per app.
+
+Kept apart from app.py so the modules split out of it (jobs.py) can use the
+database without importing the whole application.
+"""
+from flask_sqlalchemy import SQLAlchemy
+from flask_wtf import CSRFProtect
+
+db = SQLAlchemy()
+csrf = CSRFProtect()
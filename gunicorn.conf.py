@@ -0,0 +1,40 @@
+"""Gunicorn settings, tuned for a preloaded app.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment (or the command line).
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Every /api/stats/stream connection holds a thread for as long as the page
+# is open, so a few dashboards would use up a gthread worker. Serve the
+# stream only from async workers (GUNICORN_WORKER_CLASS=gevent with gevent
+# installed); otherwise the dashboard polls /api/stats. Read by the app,
+# which is loaded after this file
+os.environ.setdefault('LIVE_STATS_STREAM', '1' if worker_class in ('gevent', 'eventlet') else '0')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+# Import and warm the app once in the master, then fork the workers
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    # Move everything the preloaded app allocated out of the cyclic GC's
+    # reach; otherwise the first collection in each worker writes to (and so
+    # copies) nearly every shared page
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Engines and per-process state were reset by app.reinit_after_fork()
+    # when the worker was forked; background threads have to start here
+    from jobs import start_background_jobs
+    from wsgi import app
+
+    start_background_jobs(app)
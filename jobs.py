@@ -0,0 +1,334 @@
+"""Job queue: the jobs table, the worker pool and periodic maintenance.
+
+The handlers themselves live with the code they belong to (app.py) and
+register with @job_handler or @periodic_job. app.py runs
+start_job_workers() before the first request each process serves.
+"""
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+from extensions import db
+from metrics import request_metrics
+
+# Follow-up work of a write (stocking a donation's blood units and its
+# rollup, low-stock alerts) is queued as a jobs row inside the write's own
+# transaction and run after the commit by a small pool of worker threads in
+# each process, so the request only pays for the core row. No broker: the
+# table is the queue. Workers claim due jobs in batches with a lease (a
+# crashed worker's jobs are picked up again once it lapses). A job's
+# database effects commit in the same transaction that marks it done, and
+# that transaction starts by renewing the lease, so no other worker can take
+# the job over before it commits: the effects apply exactly once. Handlers
+# that call out to other services register with transactional=False and run
+# at least once, outside that lock. Batching keeps the queue from costing
+# each write extra commits of its own. A failure is retried with exponential
+# backoff up to JOB_MAX_ATTEMPTS. Payloads carry the values the job needs and jobs
+# only apply increments, so a job that runs after the row was edited or
+# deleted still leaves the totals right. An idempotency key (unique) makes
+# queueing the same work twice a no-op. With JOBS_INLINE every job runs in
+# the enqueuing transaction instead.
+# Periodic maintenance (stats reconcile, expiry sweep, job purge, archival)
+# runs through the queue too, so it happens once per interval across all
+# processes rather than once per process: every job worker queues each task
+# under a key naming the current interval, and the unique key lets only the
+# first one in.
+JOB_HANDLERS = {}
+NON_TRANSACTIONAL_JOBS = set()
+# kind -> config key of its interval in seconds
+PERIODIC_JOBS = {}
+JOB_CLAIM_BATCH = 50
+# After a wake-up, let a burst of writes queue more before claiming
+JOB_BATCH_DELAY = 0.05
+JOB_RETRY_BASE_SECONDS = 5
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    job_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    idempotency_key = db.Column(db.String(100), unique=True)
+    # pending -> running -> done, or back to pending for a retry, or failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claimed_by = db.Column(db.String(32))
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at', 'job_id'),
+    )
+
+def job_handler(kind, transactional=True):
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        if not transactional:
+            NON_TRANSACTIONAL_JOBS.add(kind)
+        return func
+    return register
+
+def periodic_job(kind, interval_setting):
+    # The task commits its own work, so it runs outside the job's
+    # transaction, at least once per interval
+    def register(func):
+        PERIODIC_JOBS[kind] = interval_setting
+        return job_handler(kind, transactional=False)(func)
+    return register
+
+def enqueue_job(kind, payload, key=None):
+    if current_app.config['JOBS_INLINE']:
+        JOB_HANDLERS[kind]([payload])
+        return
+    queue_job(kind, payload, key)
+
+def queue_job(kind, payload, key=None):
+    job = Job(kind=kind, payload=json.dumps(payload), idempotency_key=key)
+    if key is None:
+        db.session.add(job)
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.add(job)
+        except IntegrityError:
+            return  # already queued under this key
+    db.session.info['jobs_enqueued'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def wake_job_workers(session):
+    if session.info.pop('jobs_enqueued', False):
+        job_workers.poke()
+
+def due_jobs_filter(now):
+    # Pending and due, or claimed by a worker whose lease ran out
+    return db.or_(db.and_(Job.status == 'pending', Job.run_at <= now),
+                  db.and_(Job.status == 'running', Job.locked_until < now))
+
+def claim_jobs(limit=JOB_CLAIM_BATCH):
+    # Claims up to limit due jobs under a fresh token in one short
+    # transaction; another worker racing for the same rows claims none of
+    # them, since the token is only set where the job is still due
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    ids = db.session.scalars(
+        db.select(Job.job_id).where(due_jobs_filter(now))
+        .order_by(Job.run_at, Job.job_id).limit(limit)
+    ).all()
+    if ids:
+        db.session.execute(
+            db.update(Job)
+            .where(Job.job_id.in_(ids), due_jobs_filter(now))
+            .values(status='running', attempts=Job.attempts + 1, claimed_by=token,
+                    locked_until=now + timedelta(seconds=current_app.config['JOB_LEASE_SECONDS']))
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    if not ids:
+        return token, []
+    jobs = db.session.execute(
+        db.select(Job.job_id, Job.kind, Job.payload, Job.attempts)
+        .where(Job.claimed_by == token).order_by(Job.job_id)
+    ).all()
+    return token, jobs
+
+def renew_lease(token, job_ids):
+    # The first statement of a job batch's transaction: a write, so the
+    # handlers' savepoints nest inside a real transaction (pysqlite only
+    # opens one before DML, and a SAVEPOINT that opens it commits on
+    # RELEASE), and it holds the jobs' rows (SQLite: the write lock) until
+    # the commit. False if another worker already took a job over
+    return db.session.execute(
+        db.update(Job)
+        .where(Job.job_id.in_(job_ids), Job.claimed_by == token, Job.status == 'running')
+        .values(locked_until=datetime.utcnow() + timedelta(seconds=current_app.config['JOB_LEASE_SECONDS']))
+        .execution_options(synchronize_session=False)
+    ).rowcount == len(job_ids)
+
+def apply_jobs(kind, jobs):
+    # Returns the jobs that failed, each with its error. Handlers take a list
+    # of payloads so a batch costs a few set-based statements; if the batch
+    # fails, its jobs are retried one by one to find the ones at fault
+    payloads = [json.loads(job.payload) for job in jobs]
+    try:
+        if kind in NON_TRANSACTIONAL_JOBS:
+            JOB_HANDLERS[kind](payloads)
+        else:
+            with db.session.begin_nested():
+                JOB_HANDLERS[kind](payloads)
+        return []
+    except Exception as e:
+        if kind in NON_TRANSACTIONAL_JOBS:
+            db.session.rollback()
+        if len(jobs) == 1:
+            return [(jobs[0], e)]
+    return [failure for job in jobs for failure in apply_jobs(kind, [job])]
+
+def run_jobs(token, jobs):
+    # Jobs of one kind run, and are marked done, in one transaction; kinds
+    # run separately, so a handler that calls out to another service never
+    # holds the write lock another kind took
+    failed = []
+    for kind, group in itertools.groupby(sorted(jobs, key=lambda job: job.kind), key=lambda job: job.kind):
+        group = list(group)
+        if kind not in NON_TRANSACTIONAL_JOBS and not renew_lease(token, [job.job_id for job in group]):
+            # Another worker took some of them over and runs them. The rest
+            # stay claimed by this token until their lease lapses, then run
+            db.session.rollback()
+            request_metrics.inc('jobs_total', (('kind', kind), ('outcome', 'lost')), len(group))
+            continue
+        started = time.perf_counter()
+        failures = apply_jobs(kind, group)
+        request_metrics.observe('job_batch_seconds', (('kind', kind),), time.perf_counter() - started)
+        failed += failures
+        failed_ids = {job.job_id for job, _ in failures}
+        done = [job.job_id for job in group if job.job_id not in failed_ids]
+        if not done:
+            db.session.commit()  # release the lease renewal's lock
+            continue
+        finished = db.session.execute(
+            db.update(Job)
+            .where(Job.job_id.in_(done), Job.claimed_by == token, Job.status == 'running')
+            .values(status='done', finished_at=datetime.utcnow(), locked_until=None,
+                    claimed_by=None, last_error=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if finished == len(done):
+            db.session.commit()
+            outcome = 'done'
+        else:
+            # Only reachable for non-transactional kinds, whose effects
+            # already happened: a lease ran out and another worker took
+            # jobs over
+            db.session.rollback()
+            outcome = 'lost'
+        request_metrics.inc('jobs_total', (('kind', kind), ('outcome', outcome)), len(done))
+
+    for job, error in failed:
+        if job.attempts >= current_app.config['JOB_MAX_ATTEMPTS']:
+            values = {'status': 'failed'}
+            outcome = 'failed'
+        else:
+            values = {'status': 'pending',
+                      'run_at': datetime.utcnow() + timedelta(seconds=JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))}
+            outcome = 'retry'
+        db.session.execute(
+            db.update(Job)
+            .where(Job.job_id == job.job_id, Job.claimed_by == token)
+            .values(locked_until=None, claimed_by=None, last_error=f'{type(error).__name__}: {error}'[:2000], **values)
+            .execution_options(synchronize_session=False)
+        )
+        request_metrics.inc('jobs_total', (('kind', job.kind), ('outcome', outcome)))
+        current_app.logger.warning(f'Job {job.job_id} ({job.kind}) attempt {job.attempts} failed: {error}')
+    if failed:
+        db.session.commit()
+    return len(jobs)
+
+def run_due_jobs():
+    # Runs jobs until none are due; returns how many this call ran
+    ran = 0
+    while True:
+        token, jobs = claim_jobs()
+        if not jobs:
+            return ran
+        ran += run_jobs(token, jobs)
+
+def purge_jobs(days):
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    purged = db.session.execute(
+        db.delete(Job).where(Job.status == 'done', Job.finished_at < cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return purged
+
+class JobWorkers:
+    # Per-process pool; a commit that queued jobs wakes it, and polling every
+    # JOB_POLL_INTERVAL picks up jobs queued by other processes and retries
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Also run in a forked child, where the parent's threads are gone
+        # and the lock may have been held by one of them
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        # kind -> interval this process last queued the periodic job for
+        self._periodic_slots = {}
+
+    @property
+    def started(self):
+        return bool(self._threads)
+
+    def poke(self):
+        self._wakeup.set()
+
+    def _run(self, flask_app):
+        while True:
+            if self._wakeup.wait(flask_app.config['JOB_POLL_INTERVAL']):
+                time.sleep(JOB_BATCH_DELAY)
+            self._wakeup.clear()
+            with flask_app.app_context():
+                try:
+                    self._queue_periodic_jobs(flask_app)
+                    run_due_jobs()
+                except Exception as e:
+                    db.session.rollback()
+                    flask_app.logger.warning(f'Job worker failed: {e}')
+                finally:
+                    db.session.remove()
+
+    def _queue_periodic_jobs(self, flask_app):
+        now = time.time()
+        with self._lock:
+            due = {kind: int(now // flask_app.config[setting]) for kind, setting in PERIODIC_JOBS.items()}
+            due = {kind: slot for kind, slot in due.items() if self._periodic_slots.get(kind) != slot}
+        if not due:
+            return
+        for kind, slot in due.items():
+            queue_job(kind, {}, key=f'periodic:{kind}:{slot}')
+        db.session.commit()
+        with self._lock:
+            self._periodic_slots.update(due)
+
+    def start(self, flask_app, workers):
+        with self._lock:
+            while len(self._threads) < workers:
+                thread = threading.Thread(target=self._run, args=(flask_app,),
+                                          name=f'job-worker-{len(self._threads) + 1}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self.poke()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+job_workers = JobWorkers()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=job_workers.reset)
+
+def start_job_workers():
+    # gunicorn.conf.py starts them as each worker forks; under any other
+    # server (flask run, gunicorn without -c, uWSGI) the process starts them
+    # on the first request it serves. CLI commands never get here
+    if not job_workers.started and current_app.config['JOB_WORKERS']:
+        job_workers.start(current_app._get_current_object(), current_app.config['JOB_WORKERS'])
+
+@periodic_job('purge_jobs', 'JOB_PURGE_INTERVAL')
+def purge_jobs_job(payloads):
+    purge_jobs(current_app.config['JOB_RETENTION_DAYS'])
+
+def start_background_jobs(flask_app):
+    # Periodic maintenance is queued by the job workers, see PERIODIC_JOBS
+    job_workers.start(flask_app, flask_app.config['JOB_WORKERS'])
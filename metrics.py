@@ -0,0 +1,91 @@
+"""Per-process metrics registry, served at /metrics in the Prometheus text format.
+
+app.py records the request, SQL and template numbers into it and the job
+workers (jobs.py) their outcomes and batch times.
+"""
+import bisect
+import itertools
+import os
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# metric name -> (type, help)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests served, by endpoint, method and status'),
+    'http_request_duration_seconds': ('histogram', 'Request latency'),
+    'db_queries_per_request': ('histogram', 'SQL statements executed per request'),
+    'db_query_seconds_per_request': ('histogram', 'Time spent in SQL per request'),
+    'template_render_seconds': ('histogram', 'Template render time per request'),
+    'db_slow_queries_total': ('counter', 'SQL statements slower than SLOW_QUERY_MS'),
+    'jobs_total': ('counter', 'Queued jobs run, by kind and outcome'),
+    'job_batch_seconds': ('histogram', 'Handler run time per batch of one kind of job'),
+}
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # Bucket i counts values <= buckets[i]; the last slot is +Inf
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestMetrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Also run in a forked child: its numbers start from zero, and the
+        # lock may have been held by another thread at fork time
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}    # (name, labels) -> value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (h.buckets, list(h.counts), h.sum, h.count))
+                                for key, h in self._histograms.items())
+        samples = {}
+        for (name, labels), value in counters:
+            samples.setdefault(name, []).append(f'{name}{format_labels(labels)} {value}')
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            lines = samples.setdefault(name, [])
+            for bound, cumulative in zip(buckets + ('+Inf',), itertools.accumulate(counts)):
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {total:.6f}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+
+        output = []
+        for name, (kind, help_text) in METRICS.items():
+            if name in samples:
+                output += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}'] + samples[name]
+        return '\n'.join(output) + '\n'
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+request_metrics = RequestMetrics()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=request_metrics.reset)
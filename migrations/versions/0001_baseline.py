@@ -0,0 +1,252 @@
+"""baseline
+
+The schema as db.create_all() built it before migrations existed.
+Databases created that way already have some or all of these tables, and
+older ones lack some indexes and the search index, so only the missing
+tables, indexes and search objects are created; run `flask db upgrade` on
+them as-is.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 06:46:33.651306
+
+"""
+import sqlite3
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# table -> [(index name, columns)]
+INDEXES = {
+    'blood_units': [
+        ('ix_blood_units_fefo', ['blood_group', 'status', 'expires_on', 'unit_id']),
+        ('ix_blood_units_status_expires_on', ['status', 'expires_on']),
+    ],
+    'donors': [
+        ('ix_donors_blood_group_last_donation', ['blood_group', 'last_donation_date']),
+        ('ix_donors_created_at_id', ['created_at', 'donor_id']),
+        ('ix_donors_name', ['name']),
+    ],
+    'inventory_ledger': [
+        ('ix_inventory_ledger_blood_group', ['blood_group']),
+    ],
+    'recipients': [
+        ('ix_recipients_created_at_id', ['created_at', 'recipient_id']),
+        ('ix_recipients_name', ['name']),
+    ],
+    'blood_requests': [
+        ('ix_blood_requests_created_at_id', ['created_at', 'request_id']),
+    ],
+    'donations': [
+        ('ix_donations_created_at_id', ['created_at', 'donation_id']),
+    ],
+}
+
+# The search objects app.py's Search section created at the time:
+# table -> (SQLite FTS5 table and sync triggers, MySQL FULLTEXT index)
+SEARCH_DDL = {
+    'donors': (
+        [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS donors_fts USING fts5(name, email, content='donors', "
+            "content_rowid='donor_id', tokenize='trigram')",
+            "CREATE TRIGGER IF NOT EXISTS donors_fts_ai AFTER INSERT ON donors BEGIN "
+            "INSERT INTO donors_fts(rowid, name, email) VALUES (new.donor_id, new.name, new.email); END",
+            "CREATE TRIGGER IF NOT EXISTS donors_fts_ad AFTER DELETE ON donors BEGIN "
+            "INSERT INTO donors_fts(donors_fts, rowid, name, email) "
+            "VALUES ('delete', old.donor_id, old.name, old.email); END",
+            "CREATE TRIGGER IF NOT EXISTS donors_fts_au AFTER UPDATE OF name, email ON donors BEGIN "
+            "INSERT INTO donors_fts(donors_fts, rowid, name, email) "
+            "VALUES ('delete', old.donor_id, old.name, old.email); "
+            "INSERT INTO donors_fts(rowid, name, email) VALUES (new.donor_id, new.name, new.email); END",
+        ],
+        'ALTER TABLE donors ADD FULLTEXT INDEX ft_donors (name, email) WITH PARSER ngram',
+    ),
+    'recipients': (
+        [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS recipients_fts USING fts5(name, content='recipients', "
+            "content_rowid='recipient_id', tokenize='trigram')",
+            "CREATE TRIGGER IF NOT EXISTS recipients_fts_ai AFTER INSERT ON recipients BEGIN "
+            "INSERT INTO recipients_fts(rowid, name) VALUES (new.recipient_id, new.name); END",
+            "CREATE TRIGGER IF NOT EXISTS recipients_fts_ad AFTER DELETE ON recipients BEGIN "
+            "INSERT INTO recipients_fts(recipients_fts, rowid, name) VALUES ('delete', old.recipient_id, old.name); END",
+            "CREATE TRIGGER IF NOT EXISTS recipients_fts_au AFTER UPDATE OF name ON recipients BEGIN "
+            "INSERT INTO recipients_fts(recipients_fts, rowid, name) VALUES ('delete', old.recipient_id, old.name); "
+            "INSERT INTO recipients_fts(rowid, name) VALUES (new.recipient_id, new.name); END",
+        ],
+        'ALTER TABLE recipients ADD FULLTEXT INDEX ft_recipients (name) WITH PARSER ngram',
+    ),
+}
+
+def create_search_index(inspector, table):
+    # Creates the search objects and indexes the rows an existing table
+    # already holds
+    sqlite_ddl, mysql_ddl = SEARCH_DDL[table]
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34):
+        if not inspector.has_table(f'{table}_fts'):
+            for statement in sqlite_ddl:
+                op.execute(statement)
+            op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+    elif dialect == 'mysql':
+        if not any(index['name'] == f'ft_{table}' for index in inspector.get_indexes(table)):
+            op.execute(mysql_ddl)
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'blood_inventory' not in existing:
+        op.create_table('blood_inventory',
+        sa.Column('inventory_id', sa.Integer(), nullable=False),
+        sa.Column('blood_group', sa.String(length=5), nullable=False),
+        sa.Column('total_units', sa.Integer(), nullable=True),
+        sa.Column('last_updated', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('inventory_id'),
+        sa.UniqueConstraint('blood_group')
+        )
+
+    if 'blood_units' not in existing:
+        op.create_table('blood_units',
+        sa.Column('unit_id', sa.Integer(), nullable=False),
+        sa.Column('blood_group', sa.String(length=5), nullable=False),
+        sa.Column('volume_ml', sa.Integer(), nullable=False),
+        sa.Column('collected_on', sa.Date(), nullable=False),
+        sa.Column('expires_on', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('donation_id', sa.Integer(), nullable=True),
+        sa.Column('request_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('unit_id')
+        )
+
+    if 'dashboard_stats' not in existing:
+        op.create_table('dashboard_stats',
+        sa.Column('stats_id', sa.Integer(), nullable=False),
+        sa.Column('total_donors', sa.Integer(), nullable=False),
+        sa.Column('total_recipients', sa.Integer(), nullable=False),
+        sa.Column('total_donations', sa.Integer(), nullable=False),
+        sa.Column('total_requests', sa.Integer(), nullable=False),
+        sa.Column('last_reconciled', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('stats_id')
+        )
+
+    if 'donation_daily_rollup' not in existing:
+        op.create_table('donation_daily_rollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('blood_group', sa.String(length=5), nullable=False),
+        sa.Column('hospital', sa.String(length=100), nullable=False),
+        sa.Column('donations', sa.Integer(), nullable=False),
+        sa.Column('volume_ml', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'blood_group', 'hospital')
+        )
+
+    if 'donors' not in existing:
+        op.create_table('donors',
+        sa.Column('donor_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('age', sa.Integer(), nullable=False),
+        sa.Column('gender', sa.String(length=10), nullable=False),
+        sa.Column('blood_group', sa.String(length=5), nullable=False),
+        sa.Column('phone', sa.String(length=15), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('address', sa.Text(), nullable=False),
+        sa.Column('last_donation_date', sa.Date(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('donor_id')
+        )
+
+    if 'inventory_ledger' not in existing:
+        op.create_table('inventory_ledger',
+        sa.Column('movement_id', sa.Integer(), nullable=False),
+        sa.Column('blood_group', sa.String(length=5), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(length=20), nullable=False),
+        sa.Column('donation_id', sa.Integer(), nullable=True),
+        sa.Column('request_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('movement_id')
+        )
+
+    if 'recipients' not in existing:
+        op.create_table('recipients',
+        sa.Column('recipient_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('age', sa.Integer(), nullable=False),
+        sa.Column('gender', sa.String(length=10), nullable=False),
+        sa.Column('blood_group', sa.String(length=5), nullable=False),
+        sa.Column('phone', sa.String(length=15), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('address', sa.Text(), nullable=False),
+        sa.Column('request_status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('recipient_id')
+        )
+
+    if 'request_daily_rollup' not in existing:
+        op.create_table('request_daily_rollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('blood_group', sa.String(length=5), nullable=False),
+        sa.Column('requested', sa.Integer(), nullable=False),
+        sa.Column('requested_ml', sa.Integer(), nullable=False),
+        sa.Column('fulfilled', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'blood_group')
+        )
+
+    if 'blood_requests' not in existing:
+        op.create_table('blood_requests',
+        sa.Column('request_id', sa.Integer(), nullable=False),
+        sa.Column('recipient_id', sa.Integer(), nullable=False),
+        sa.Column('blood_group', sa.String(length=5), nullable=False),
+        sa.Column('quantity_needed_ml', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['recipient_id'], ['recipients.recipient_id'], ),
+        sa.PrimaryKeyConstraint('request_id')
+        )
+
+    if 'donations' not in existing:
+        op.create_table('donations',
+        sa.Column('donation_id', sa.Integer(), nullable=False),
+        sa.Column('donor_id', sa.Integer(), nullable=False),
+        sa.Column('donation_date', sa.Date(), nullable=False),
+        sa.Column('blood_volume_ml', sa.Integer(), nullable=False),
+        sa.Column('hospital', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['donor_id'], ['donors.donor_id'], ),
+        sa.PrimaryKeyConstraint('donation_id')
+        )
+
+    # Tables that already existed may predate some of their indexes
+    inspector = sa.inspect(op.get_bind())
+    for table, indexes in INDEXES.items():
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table)}
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, columns in indexes:
+                if name not in existing_indexes:
+                    batch_op.create_index(name, columns, unique=False)
+    for table in SEARCH_DDL:
+        create_search_index(inspector, table)
+
+
+def downgrade():
+    op.drop_table('donations')
+    op.drop_table('blood_requests')
+    op.drop_table('request_daily_rollup')
+    for table in ('recipients', 'donors'):
+        if op.get_bind().dialect.name == 'sqlite':
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+    op.drop_table('recipients')
+    op.drop_table('inventory_ledger')
+    op.drop_table('donors')
+    op.drop_table('donation_daily_rollup')
+    op.drop_table('dashboard_stats')
+    op.drop_table('blood_units')
+    op.drop_table('blood_inventory')
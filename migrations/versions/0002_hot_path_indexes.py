@@ -0,0 +1,51 @@
+"""add indexes for list filters and joins
+
+Status-filtered request lists, the donation/donor and request/recipient
+joins and recipient blood-group searches all scanned their tables.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 07:02:11.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# table -> [(index name, columns)]
+INDEXES = {
+    'blood_requests': [
+        ('ix_blood_requests_status_created_at_id', ['status', 'created_at', 'request_id']),
+        ('ix_blood_requests_recipient_id', ['recipient_id']),
+    ],
+    'donations': [
+        ('ix_donations_donor_id_donation_date', ['donor_id', 'donation_date']),
+    ],
+    'recipients': [
+        ('ix_recipients_blood_group_created_at_id', ['blood_group', 'created_at', 'recipient_id']),
+    ],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, indexes in INDEXES.items():
+        # db.create_all() from a newer checkout may have built them already
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, columns in indexes:
+                if name not in existing:
+                    batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    for table, indexes in INDEXES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, _ in indexes:
+                batch_op.drop_index(name)
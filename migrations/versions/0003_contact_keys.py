@@ -0,0 +1,79 @@
+"""add normalized phone/email keys for duplicate detection
+
+Donors and recipients get indexed phone_key/email_key columns, backfilled
+from the stored phone numbers and emails in batches.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 08:14:52.390116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+TABLES = {'donors': 'donor_id', 'recipients': 'recipient_id'}
+BATCH_SIZE = 5000
+PHONE_KEY_DIGITS = 10
+
+
+# The normalization the models applied on every write at the time
+def normalize_phone(phone):
+    digits = ''.join(c for c in phone or '' if c.isdigit())
+    return digits[-PHONE_KEY_DIGITS:] or None
+
+
+def normalize_email(email):
+    local, _, domain = (email or '').strip().lower().partition('@')
+    if not domain:
+        return local or None
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def backfill(table, id_col):
+    bind = op.get_bind()
+    rows = sa.table(table, sa.column(id_col), sa.column('phone'), sa.column('email'),
+                    sa.column('phone_key'), sa.column('email_key'))
+    update = (rows.update().where(rows.c[id_col] == sa.bindparam('b_id'))
+              .values(phone_key=sa.bindparam('b_phone'), email_key=sa.bindparam('b_email')))
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(rows.c[id_col], rows.c.phone, rows.c.email)
+            .where(rows.c[id_col] > last_id).order_by(rows.c[id_col]).limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            return
+        bind.execute(update, [{'b_id': row[0], 'b_phone': normalize_phone(row[1]),
+                               'b_email': normalize_email(row[2])} for row in batch])
+        last_id = batch[-1][0]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, id_col in TABLES.items():
+        # db.create_all() from a newer checkout may have added them already
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            if 'phone_key' not in existing:
+                batch_op.add_column(sa.Column('phone_key', sa.String(length=15), nullable=True))
+                batch_op.create_index(batch_op.f(f'ix_{table}_phone_key'), ['phone_key'], unique=False)
+            if 'email_key' not in existing:
+                batch_op.add_column(sa.Column('email_key', sa.String(length=100), nullable=True))
+                batch_op.create_index(batch_op.f(f'ix_{table}_email_key'), ['email_key'], unique=False)
+        backfill(table, id_col)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_email_key'))
+            batch_op.drop_index(batch_op.f(f'ix_{table}_phone_key'))
+            batch_op.drop_column('email_key')
+            batch_op.drop_column('phone_key')
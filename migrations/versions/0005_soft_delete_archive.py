@@ -0,0 +1,93 @@
+"""soft delete and archive tables for old donations and closed requests
+
+Donors, recipients, requests and donations get a nullable deleted_at
+column; donations older than the archive cutoff and closed requests move
+to donations_archive / blood_requests_archive.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 11:02:45.183307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+SOFT_DELETE_TABLES = ('donors', 'recipients', 'blood_requests', 'donations')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # db.create_all() from a newer checkout may have added them already
+    for table in SOFT_DELETE_TABLES:
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        if 'deleted_at' not in existing:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+                batch_op.create_index(batch_op.f(f'ix_{table}_deleted_at'), ['deleted_at'], unique=False)
+
+    if 'ix_donations_donation_date' not in {index['name'] for index in inspector.get_indexes('donations')}:
+        with op.batch_alter_table('donations', schema=None) as batch_op:
+            batch_op.create_index('ix_donations_donation_date', ['donation_date'], unique=False)
+
+    if not inspector.has_table('donations_archive'):
+        op.create_table('donations_archive',
+            sa.Column('donation_id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('donor_id', sa.Integer(), nullable=False),
+            sa.Column('donation_date', sa.Date(), nullable=False),
+            sa.Column('blood_volume_ml', sa.Integer(), nullable=False),
+            sa.Column('hospital', sa.String(length=100), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('deleted_at', sa.DateTime(), nullable=True),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('donation_id')
+        )
+        with op.batch_alter_table('donations_archive', schema=None) as batch_op:
+            batch_op.create_index('ix_donations_archive_created_at_id', ['created_at', 'donation_id'], unique=False)
+            batch_op.create_index('ix_donations_archive_donor_id', ['donor_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_donations_archive_deleted_at'), ['deleted_at'], unique=False)
+
+    if not inspector.has_table('blood_requests_archive'):
+        op.create_table('blood_requests_archive',
+            sa.Column('request_id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('recipient_id', sa.Integer(), nullable=False),
+            sa.Column('blood_group', sa.String(length=5), nullable=False),
+            sa.Column('quantity_needed_ml', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('deleted_at', sa.DateTime(), nullable=True),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('request_id')
+        )
+        with op.batch_alter_table('blood_requests_archive', schema=None) as batch_op:
+            batch_op.create_index('ix_blood_requests_archive_created_at_id', ['created_at', 'request_id'], unique=False)
+            batch_op.create_index('ix_blood_requests_archive_status_created_at_id',
+                                  ['status', 'created_at', 'request_id'], unique=False)
+            batch_op.create_index('ix_blood_requests_archive_recipient_id', ['recipient_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_blood_requests_archive_deleted_at'), ['deleted_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blood_requests_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blood_requests_archive_deleted_at'))
+        batch_op.drop_index('ix_blood_requests_archive_recipient_id')
+        batch_op.drop_index('ix_blood_requests_archive_status_created_at_id')
+        batch_op.drop_index('ix_blood_requests_archive_created_at_id')
+    op.drop_table('blood_requests_archive')
+    with op.batch_alter_table('donations_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_donations_archive_deleted_at'))
+        batch_op.drop_index('ix_donations_archive_donor_id')
+        batch_op.drop_index('ix_donations_archive_created_at_id')
+    op.drop_table('donations_archive')
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.drop_index('ix_donations_donation_date')
+    for table in reversed(SOFT_DELETE_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_deleted_at'))
+            batch_op.drop_column('deleted_at')
@@ -0,0 +1,56 @@
+"""rebuild the created_at list indexes as partial indexes over live rows
+
+Every list query filters on "deleted_at IS NULL". With a standalone
+deleted_at index the planner searched that index for every live row and
+sorted them by created_at, so keyset pages no longer stopped after one
+page. Partial (created_at, id) indexes over the live rows keep those lists
+an index walk with no sort.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 14:26:03.771942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+LIVE = sa.text('deleted_at IS NULL')
+
+# table -> (id column, (created_at, id) index it replaces)
+TABLES = {
+    'donors': ('donor_id', 'ix_donors_created_at_id'),
+    'recipients': ('recipient_id', 'ix_recipients_created_at_id'),
+    'blood_requests': ('request_id', 'ix_blood_requests_created_at_id'),
+    'donations': ('donation_id', 'ix_donations_created_at_id'),
+    'donations_archive': ('donation_id', 'ix_donations_archive_created_at_id'),
+    'blood_requests_archive': ('request_id', 'ix_blood_requests_archive_created_at_id'),
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, (id_col, replaced) in TABLES.items():
+        # db.create_all() from a newer checkout may have built them already
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name in (replaced, f'ix_{table}_deleted_at'):
+                if name in existing:
+                    batch_op.drop_index(name)
+            if f'ix_{table}_live_created_at_id' not in existing:
+                batch_op.create_index(f'ix_{table}_live_created_at_id', ['created_at', id_col], unique=False,
+                                      sqlite_where=LIVE, postgresql_where=LIVE)
+
+
+def downgrade():
+    for table, (id_col, replaced) in TABLES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_live_created_at_id')
+            batch_op.create_index(replaced, ['created_at', id_col], unique=False)
+            batch_op.create_index(batch_op.f(f'ix_{table}_deleted_at'), ['deleted_at'], unique=False)
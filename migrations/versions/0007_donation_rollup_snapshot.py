@@ -0,0 +1,61 @@
+"""snapshot the donor's blood group on donations and flag counted ones
+
+Donations get the blood group they are counted under in the daily rollup
+and a rolled_up flag saying whether the rollup counts them, so edits and
+deletes only take back what was counted and a donor's group correction
+can move the rows. Existing donations take their donor's current group and
+the donation rollup is recomputed from them, every live donation counted.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 18:40:12.504117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+TABLES = ('donations', 'donations_archive')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        # db.create_all() from a newer checkout may have added them already
+        if 'blood_group' in {column['name'] for column in inspector.get_columns(table)}:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('blood_group', sa.String(length=5), nullable=True))
+            batch_op.add_column(sa.Column('rolled_up', sa.Boolean(), server_default=sa.false(), nullable=False))
+        op.execute(f"""
+            UPDATE {table}
+            SET blood_group = (SELECT donors.blood_group FROM donors WHERE donors.donor_id = {table}.donor_id),
+                rolled_up = deleted_at IS NULL
+        """)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('blood_group', existing_type=sa.String(length=5), nullable=False)
+
+    op.execute('DELETE FROM donation_daily_rollup')
+    op.execute("""
+        INSERT INTO donation_daily_rollup (day, blood_group, hospital, donations, volume_ml)
+        SELECT donation_date, blood_group, hospital, count(*), sum(blood_volume_ml)
+        FROM (SELECT donation_date, blood_group, hospital, blood_volume_ml FROM donations
+              WHERE deleted_at IS NULL
+              UNION ALL
+              SELECT donation_date, blood_group, hospital, blood_volume_ml FROM donations_archive
+              WHERE deleted_at IS NULL)
+        GROUP BY donation_date, blood_group, hospital
+    """)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('rolled_up')
+            batch_op.drop_column('blood_group')
@@ -0,0 +1,113 @@
+"""Fail if a job whose lease was taken over applies its effects twice.
+
+Queues a donation's stocking job, lets one worker claim it, expires the
+lease so a second worker claims it too, and runs both claims in each
+order. The donation must end up stocked exactly once: one set of blood
+units, one inventory movement and one donation in the daily rollup.
+
+    python scripts/check_job_lease.py
+"""
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmpdir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'jobs.db')}"
+
+from app import (create_app, db, Donor, Donation, BloodUnit, InventoryMovement,  # noqa: E402
+                 DonationRollup, record_donation)
+from jobs import Job, claim_jobs, run_jobs  # noqa: E402
+
+app = create_app()
+
+
+def queue_donation(hospital):
+    n = db.session.scalar(db.select(db.func.count(Donor.donor_id)))
+    donor = Donor(name=f'Donor {n}', age=30, gender='Male', blood_group='A+',
+                  phone=f'555000{n:04d}', email=f'donor{n}@example.com', address='Street')
+    db.session.add(donor)
+    db.session.flush()
+    donation = Donation(donor_id=donor.donor_id, donation_date=date.today(), blood_volume_ml=450, hospital=hospital)
+    record_donation(donation)
+    db.session.commit()
+    return donation.donation_id
+
+
+def expire_leases():
+    db.session.execute(db.update(Job).where(Job.status == 'running')
+                       .values(locked_until=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+
+def takeover_then_stale(hospital):
+    # B takes the job over and finishes it; A's late run must not apply
+    stale = claim_jobs()
+    expire_leases()
+    run_jobs(*claim_jobs())
+    run_jobs(*stale)
+
+
+def stale_then_takeover(hospital):
+    # B takes the job over, A's late run comes first; B's must still apply
+    stale = claim_jobs()
+    expire_leases()
+    current = claim_jobs()
+    run_jobs(*stale)
+    run_jobs(*current)
+
+
+def expired_but_unclaimed(hospital):
+    # Nobody took the job over, so A still owns it and runs it once
+    stale = claim_jobs()
+    expire_leases()
+    run_jobs(*stale)
+    run_jobs(*claim_jobs())
+
+
+SCENARIOS = {'Takeover First': takeover_then_stale, 'Stale First': stale_then_takeover,
+             'Unclaimed': expired_but_unclaimed}
+
+
+def stocked(donation_id, hospital):
+    scalar = db.session.scalar
+    rollup = db.session.execute(db.select(DonationRollup.donations, DonationRollup.volume_ml)
+                                .where(DonationRollup.hospital == hospital)).first()
+    return {
+        'units': scalar(db.select(db.func.count()).where(BloodUnit.donation_id == donation_id)),
+        'movements': scalar(db.select(db.func.count()).where(InventoryMovement.donation_id == donation_id)),
+        'rollup': tuple(rollup) if rollup else None,
+        'job': scalar(db.select(Job.status).where(Job.idempotency_key == f'donation:{donation_id}')),
+    }
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+        expected = None
+        failures = 0
+        for hospital, scenario in SCENARIOS.items():
+            donation_id = queue_donation(hospital)
+            scenario(hospital)
+            db.session.remove()
+            result = stocked(donation_id, hospital)
+            if expected is None:
+                # A run without any lease trouble sets the baseline
+                baseline_id = queue_donation('Baseline')
+                run_jobs(*claim_jobs())
+                expected = stocked(baseline_id, 'Baseline')
+            ok = result == expected and expected['job'] == 'done'
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {scenario.__name__:<24} {result} (expected {expected})")
+
+    if failures:
+        print(f'❌ {failures} lease takeover scenario(s) applied a job more or less than once')
+        sys.exit(1)
+    print('✅ Jobs apply exactly once across lease takeovers')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Fail if any list page issues more SQL queries than its budget.
+
+Seeds a throwaway SQLite database with enough rows to fill a page, renders
+every list route through the Flask test client and counts the statements
+sent to the database. An N+1 regression (e.g. a template touching a lazy
+relationship per row) pushes the count past the budget and the script
+exits non-zero.
+
+    python scripts/check_query_budget.py
+"""
+import os
+import sys
+import tempfile
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmpdir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'budget.db')}"
+# Job workers polling in the background would add to the counted statements
+os.environ['JOB_WORKERS'] = '0'
+
+from sqlalchemy import event  # noqa: E402
+
+from app import (create_app, db, Donor, Recipient, Donation, BloodRequest,  # noqa: E402
+                 BloodInventory, reconcile_stats)
+
+app = create_app()
+
+# Maximum statements per page render, independent of the number of rows shown
+QUERY_BUDGET = {
+    '/': 4,
+    '/donor/view': 3,
+    '/recipient/view': 3,
+    '/donations/view': 3,
+    '/donations/view?search=A': 3,
+    '/requests/view': 3,
+    '/requests/view?status=Pending': 3,
+    '/donations/view?archived=1': 3,
+    '/requests/view?archived=1': 3,
+    '/blood_inventory': 2,
+}
+
+ROWS = 25
+
+
+def seed():
+    for i in range(ROWS):
+        donor = Donor(name=f'Donor {i}', age=30, gender='Male', blood_group='A+',
+                      phone=f'555000{i:04d}', email=f'donor{i}@example.com', address='Street')
+        recipient = Recipient(name=f'Recipient {i}', age=40, gender='Female', blood_group='A+',
+                              phone=f'555100{i:04d}', email=f'recipient{i}@example.com', address='Street')
+        db.session.add_all([donor, recipient])
+        db.session.flush()
+        db.session.add(Donation(donor_id=donor.donor_id, donation_date=date.today(),
+                                blood_volume_ml=450, hospital='General'))
+        db.session.add(BloodRequest(recipient_id=recipient.recipient_id, blood_group='A+',
+                                    quantity_needed_ml=450))
+    db.session.add(BloodInventory(blood_group='A+', total_units=ROWS))
+    reconcile_stats()
+    db.session.commit()
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+        seed()
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        client = app.test_client()
+        failures = 0
+        for url, budget in QUERY_BUDGET.items():
+            statements.clear()
+            response = client.get(url)
+            count = len(statements)
+            ok = response.status_code == 200 and count <= budget
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {url:<32} {count:>3} queries (budget {budget}, "
+                  f"status {response.status_code})")
+            if not ok:
+                for statement in statements:
+                    print(f'       {" ".join(statement.split())[:160]}')
+
+    if failures:
+        print(f'❌ {failures} route(s) over query budget')
+        sys.exit(1)
+    print('✅ All list routes within query budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Fail if any list query falls back to a full table scan or sort.
+
+Builds a throwaway SQLite database through the migrations (so the check
+also covers them), seeds a few rows, renders every list route and API
+listing through the Flask test client and runs EXPLAIN QUERY PLAN on each
+SELECT they send. A plan step that scans a large table without an index
+(plain "SCAN <table>") is a missing index, and a "USE TEMP B-TREE FOR
+ORDER BY" over a whole large table is a list index the planner could not
+use; either makes the script exit non-zero.
+
+    python scripts/check_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmpdir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'plans.db')}"
+# Job workers polling in the background would add to the counted statements
+os.environ['JOB_WORKERS'] = '0'
+
+from flask_migrate import upgrade  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import (create_app, db, Donor, Recipient, Donation, BloodRequest,  # noqa: E402
+                 reconcile_stats, rebuild_rollups, archive_records)
+
+app = create_app()
+
+ROWS = 25
+OLD = datetime.utcnow() - timedelta(days=800)
+
+URLS = [
+    '/',
+    '/donor/view',
+    '/donor/view?after=',
+    '/donor/view?search=Donor',
+    '/donor/view?search=A%2B',
+    '/recipient/view',
+    '/recipient/view?search=Recipient',
+    '/recipient/view?search=O-',
+    '/donations/view',
+    '/donations/view?after=',
+    '/donations/view?search=Donor',
+    '/requests/view',
+    '/requests/view?after=',
+    '/requests/view?status=Pending',
+    '/donations/view?archived=1',
+    '/donations/view?archived=1&after=',
+    '/requests/view?archived=1&after=',
+    '/requests/view?archived=1&status=Completed',
+    '/api/donors/eligible?blood_group=A%2B',
+    '/api/donors/lookup?q=Don',
+    f'/api/requests/{ROWS}/matches',
+    '/api/requests/matches',
+    '/api/v1/donations',
+    '/api/v1/requests?status=Pending',
+    '/api/v1/donations?archived=1',
+    '/api/v1/requests?archived=1&status=Completed',
+    '/api/reports',
+]
+
+# Tables that stay a handful of rows; scanning them is fine
+SMALL_TABLES = {'blood_inventory', 'dashboard_stats', 'alembic_version'}
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+SUBQUERY = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\w+)$')
+SORT = re.compile(r'^USE TEMP B-TREE FOR .*ORDER BY$')
+LOOP = re.compile(r'^(?:SCAN|SEARCH) (\w+)')
+# Sorting a search's matches is fine; sorting a whole table (any SCAN, or a
+# SEARCH on deleted_at alone, which matches every live row) is not
+WHOLE_TABLE = re.compile(r'^SCAN |\(deleted_at=\?\)$')
+
+
+def seed():
+    for i in range(ROWS):
+        donor = Donor(name=f'Donor {i}', age=30, gender='Male', blood_group='A+',
+                      phone=f'555000{i:04d}', email=f'donor{i}@example.com', address='Street')
+        recipient = Recipient(name=f'Recipient {i}', age=40, gender='Female', blood_group='A+',
+                              phone=f'555100{i:04d}', email=f'recipient{i}@example.com', address='Street')
+        db.session.add_all([donor, recipient])
+        db.session.flush()
+        # The older half goes to the archive tables below
+        old = i < ROWS // 2
+        db.session.add(Donation(donor_id=donor.donor_id, donation_date=OLD.date() if old else date.today(),
+                                blood_volume_ml=450, hospital='General'))
+        db.session.add(BloodRequest(recipient_id=recipient.recipient_id, blood_group='A+',
+                                    quantity_needed_ml=450, status='Completed' if old else 'Pending',
+                                    created_at=OLD if old else datetime.utcnow()))
+    reconcile_stats()
+    rebuild_rollups()
+    db.session.commit()
+    archive_records(days=365)
+
+
+def full_scans(connection, statement, parameters):
+    plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    # Scanning a subquery's rows (e.g. the live + archived UNION) is fine;
+    # its own steps are checked like any other
+    subqueries = {match.group(1) for row in plan if (match := SUBQUERY.match(row[-1]))}
+    scans = []
+    for row in plan:
+        match = FULL_SCAN.match(row[-1])
+        if match and match.group(1) not in SMALL_TABLES | subqueries:
+            scans.append(row[-1])
+        elif SORT.match(row[-1]):
+            # The sort holds every row of the outer loop at its level
+            outer = next((step[-1] for step in plan if step[1] == row[1] and LOOP.match(step[-1])), None)
+            table = outer and LOOP.match(outer).group(1)
+            if table and table not in SMALL_TABLES | subqueries and WHOLE_TABLE.search(outer):
+                scans.append(f'{row[-1]} over {outer}')
+    return scans
+
+
+def main():
+    with app.app_context():
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+        seed()
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, parameters, *rest: statements.append((statement, parameters)))
+
+        client = app.test_client()
+        failures = 0
+        for url in URLS:
+            statements.clear()
+            response = client.get(url)
+            selects = [(s, p) for s, p in statements if s.lstrip().upper().startswith(('SELECT', 'WITH'))]
+            with db.engine.connect() as connection:
+                problems = [(s, scan) for s, p in selects for scan in full_scans(connection, s, p)]
+            ok = response.status_code == 200 and not problems
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {url:<40} {len(selects):>2} selects (status {response.status_code})")
+            for statement, scan in problems:
+                print(f'       {scan}: {" ".join(statement.split())[:160]}')
+
+    if failures:
+        print(f'❌ {failures} route(s) with full table scans or sorts')
+        sys.exit(1)
+    print('✅ No full table scans or sorts in list queries')
+
+
+if __name__ == '__main__':
+    main()
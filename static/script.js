@@ -47,6 +47,9 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Search-as-you-type record pickers (donor/recipient lookups)
+    initRecordLookups();
+
     // Delete confirmation
     const deleteButtons = document.querySelectorAll('.delete-btn');
     deleteButtons.forEach(button => {
@@ -78,9 +81,15 @@ document.addEventListener('DOMContentLoaded', function() {
     // Inventory status indicators
     updateInventoryStatus();
 
-    // Real-time data updates
-    if (document.querySelector('.dashboard-stats')) {
-        setInterval(updateDashboardStats, 30000); // Update every 30 seconds
+    // Real-time data updates: pushed over Server-Sent Events when the server
+    // streams them (data-live-stats="stream"), otherwise a 30 second poll
+    const liveStats = document.querySelector('.dashboard-stats, [data-live-stats]');
+    if (liveStats) {
+        if (window.EventSource && liveStats.dataset.liveStats === 'stream') {
+            subscribeDashboardStats();
+        } else {
+            pollDashboardStats();
+        }
     }
 
     // Form enhancement - Auto-save draft
@@ -107,6 +116,48 @@ function performSearch(query, target) {
     });
 }
 
+// Record lookup: fills a <datalist> from a JSON lookup endpoint and copies the
+// chosen record's id into the hidden form field named by data-lookup-target
+function initRecordLookups() {
+    const lookupInputs = document.querySelectorAll('[data-lookup-url]');
+    lookupInputs.forEach(input => {
+        const hiddenInput = document.getElementById(input.dataset.lookupTarget);
+        const options = document.getElementById(input.getAttribute('list'));
+        let results = {};
+        let lookupTimeout;
+
+        input.addEventListener('input', function() {
+            const selected = results[this.value];
+            if (selected) {
+                hiddenInput.value = selected.id;
+                input.dispatchEvent(new CustomEvent('lookup:selected', { detail: selected }));
+                return;
+            }
+
+            hiddenInput.value = '';
+            clearTimeout(lookupTimeout);
+            const query = this.value.trim();
+            if (!query) return;
+
+            lookupTimeout = setTimeout(() => {
+                fetch(`${input.dataset.lookupUrl}?q=${encodeURIComponent(query)}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        results = {};
+                        options.innerHTML = '';
+                        data.results.forEach(record => {
+                            results[record.text] = record;
+                            const option = document.createElement('option');
+                            option.value = record.text;
+                            options.appendChild(option);
+                        });
+                    })
+                    .catch(error => console.error('Error looking up records:', error));
+            }, 250);
+        });
+    });
+}
+
 // Blood group styling
 function getBloodGroupClass(bloodGroup) {
     const bloodGroupClasses = {
@@ -141,15 +192,50 @@ function updateInventoryStatus() {
 function updateDashboardStats() {
     fetch('/api/stats')
         .then(response => response.json())
-        .then(data => {
-            updateStatDisplay('total-donors', data.total_donors);
-            updateStatDisplay('total-recipients', data.total_recipients);
-            updateStatDisplay('total-donations', data.total_donations);
-            updateStatDisplay('total-requests', data.total_requests);
-        })
+        .then(data => applyDashboardStats(data))
         .catch(error => console.error('Error updating stats:', error));
 }
 
+function pollDashboardStats() {
+    setInterval(updateDashboardStats, 30000); // Update every 30 seconds
+}
+
+function subscribeDashboardStats() {
+    const source = new EventSource('/api/stats/stream');
+    // 'stats' carries a full snapshot, 'delta' only the fields that changed
+    source.addEventListener('stats', event => applyDashboardStats(JSON.parse(event.data)));
+    source.addEventListener('delta', event => applyDashboardStats(JSON.parse(event.data)));
+    // The browser reconnects on its own after a dropped connection; a
+    // rejected one (the stream turned off) closes it for good, so poll
+    source.addEventListener('error', () => {
+        if (source.readyState === EventSource.CLOSED) {
+            pollDashboardStats();
+        }
+    });
+}
+
+function applyDashboardStats(data) {
+    const counters = {
+        total_donors: 'total-donors',
+        total_recipients: 'total-recipients',
+        total_donations: 'total-donations',
+        total_requests: 'total-requests'
+    };
+    Object.keys(counters).forEach(key => {
+        if (key in data) {
+            updateStatDisplay(counters[key], data[key]);
+        }
+    });
+    Object.entries(data.blood_inventory || {}).forEach(([bloodGroup, units]) => {
+        const element = document.querySelector(`[data-inventory-group="${bloodGroup}"]`);
+        if (element) {
+            element.textContent = units;
+            element.classList.remove('text-danger', 'text-warning', 'text-success');
+            element.classList.add(units < 10 ? 'text-danger' : units < 20 ? 'text-warning' : 'text-success');
+        }
+    });
+}
+
 function updateStatDisplay(elementId, value) {
     const element = document.getElementById(elementId);
     if (element) {
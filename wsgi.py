@@ -0,0 +1,22 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is built and warmed up at import time, so a preloading server
+(gunicorn's preload_app, which gunicorn.conf.py turns on) does that work
+once in the master and forks it into the workers: they start serving
+immediately and share those pages copy-on-write instead of each holding a
+private copy. app.reinit_after_fork() runs in every forked worker.
+"""
+from sqlalchemy.orm import configure_mappers
+
+from app import create_app
+
+# The CLI commands, `flask db` included (and Alembic), are not needed to
+# serve requests
+app = create_app({'CLI_COMMANDS': False})
+
+# Work every worker would otherwise repeat on its first requests
+configure_mappers()
+for template in app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html')):
+    app.jinja_env.get_template(template)